@@ -0,0 +1,235 @@
+# -*- coding: UTF-8 -*-
+"""
+Asset cache shared by every screen of the game.
+
+Fonts are parsed once per (path, size), images are loaded, scaled and converted once per (path, scale), and rendered
+text surfaces are kept in a small LRU keyed by (font, text, antialias, color), so drawing a frame never touches the
+disk. Sound effects are decoded once when the mixer is started and played on a small pool of channels.
+
+The images and texts can also be pre-baked into one bundle file (see bakeAssets.py), so a cold start reads one file
+of raw pixels instead of decoding PNGs and rendering text. Bundle format (big-endian): magic "SNKA", version, length
+of a JSON index, the index (kind, key and size of every surface), then the RGBA pixels of every surface in index
+order.
+"""
+import json
+import struct
+from collections import OrderedDict
+
+import pygame
+
+FONT = "data/8-bit-pusab.ttf"  # Font used for all the text in the game
+EATING = "data/eating.wav"  # Played when the snake eats a snack
+THUD = "data/thud.wav"  # Played when the snake hits itself
+EFFECTS = {EATING: 0.05, THUD: 0.05}  # Sound effects -> volume, from 0 to 1
+BUNDLE_MAGIC = b"SNKA"
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct(">4sBI")
+
+
+class AssetCache(object):
+    """
+    This class holds the loaded fonts, images and rendered text surfaces.
+    """
+
+    def __init__(self, textCapacity=256):
+        """
+        Creates an empty cache.
+
+        :param textCapacity: Number of rendered text surfaces to keep
+        """
+        self.fonts = {}  # (path, size) -> pygame.font.Font
+        self.images = {}  # (path, scale) -> pygame.Surface
+        self.texts = OrderedDict()  # (font, text, antialias, color) -> pygame.Surface, least recently used first
+        self.textCapacity = textCapacity
+        self.fontKeys = {}  # pygame.font.Font -> (path, size), to find its texts in a bundle
+        self.bakedTexts = {}  # (path, size, text, antialias, color) -> pygame.Surface, from a bundle
+
+    def font(self, size, path=FONT):
+        """
+        Gets a font, parsing the file the first time it is asked for at this size.
+
+        :param size: Point size of the font
+        :param path: Path of the font file
+        :return: The pygame.font.Font
+        """
+        key = (path, size)
+        font = self.fonts.get(key)
+
+        if font is None:
+            font = pygame.font.Font(path, size)
+            self.fonts[key] = font
+            self.fontKeys[font] = key
+
+        return font
+
+    def image(self, path, scale=None):
+        """
+        Gets an image, loading, scaling and converting it the first time it is asked for.
+
+        :param path: Path of the image file
+        :param scale: (width, height) to scale the image to, or None to keep its size
+        :return: The pygame.Surface
+        """
+        key = (path, scale)
+        image = self.images.get(key)
+
+        if image is None:
+            image = pygame.image.load(path)
+
+            if scale is not None:
+                image = pygame.transform.scale(image, scale)
+
+            if pygame.display.get_surface() is not None:  # Converting needs the window's pixel format
+                image = image.convert_alpha()
+
+            self.images[key] = image
+
+        return image
+
+    def text(self, font, text, antialias, color):
+        """
+        Gets a rendered text surface, rendering it if it is not in the LRU.
+
+        :param font: pygame.font.Font to render with (use font() so the same object is reused)
+        :param text: Text to render
+        :param antialias: True for smooth edges
+        :param color: Color of the text
+        :return: The pygame.Surface
+        """
+        key = (font, text, antialias, color)
+        surface = self.texts.get(key)
+
+        if surface is None:
+            path, size = self.fontKeys.get(font, (None, None))
+            surface = self.bakedTexts.get((path, size, text, antialias, color))
+
+            if surface is None:
+                surface = font.render(text, antialias, color)
+
+            self.texts[key] = surface
+
+            if len(self.texts) > self.textCapacity:
+                self.texts.popitem(last=False)  # Drops the least recently used surface
+        else:
+            self.texts.move_to_end(key)
+
+        return surface
+
+    def saveBundle(self, path):
+        """
+        Writes the images and texts loaded so far to a bundle file.
+
+        :param path: Path of the bundle
+        :return: Number of surfaces written
+        """
+        surfaces = [("image", list(key), image) for key, image in self.images.items()]
+        surfaces += [("text", list(self.fontKeys[font]) + [text, antialias, color], surface)
+                     for (font, text, antialias, color), surface in self.texts.items() if font in self.fontKeys]
+        surfaces = [entry for entry in surfaces if entry[2].get_width() and entry[2].get_height()]  # Not empty texts
+        index = [{"kind": kind, "key": key, "size": surface.get_size()} for kind, key, surface in surfaces]
+        indexData = json.dumps(index).encode("utf-8")
+
+        with open(path, "wb") as bundle:
+            bundle.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(indexData)))
+            bundle.write(indexData)
+
+            for kind, key, surface in surfaces:
+                bundle.write(pygame.image.tobytes(surface, "RGBA"))
+
+        return len(surfaces)
+
+    def loadBundle(self, path):
+        """
+        Loads the images and texts of a bundle file, converted to the window's pixel format if there is a window.
+
+        :param path: Path of the bundle
+        :return: Number of surfaces loaded
+        """
+        with open(path, "rb") as bundle:
+            data = bundle.read()
+
+        magic, version, indexLength = BUNDLE_HEADER.unpack_from(data)
+
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            raise ValueError("not a version %d asset bundle: %s" % (BUNDLE_VERSION, path))
+
+        offset = BUNDLE_HEADER.size + indexLength
+        index = json.loads(data[BUNDLE_HEADER.size:offset].decode("utf-8"))
+        convert = pygame.display.get_surface() is not None  # Converting needs the window's pixel format
+
+        for entry in index:
+            width, height = entry["size"]
+            surface = pygame.image.frombytes(data[offset:offset + width * height * 4], (width, height), "RGBA")
+            offset += width * height * 4
+
+            if convert:
+                surface = surface.convert_alpha()
+
+            if entry["kind"] == "image":
+                imagePath, scale = entry["key"]
+                self.images[(imagePath, tuple(scale) if scale else None)] = surface
+            else:
+                fontPath, size, text, antialias, color = entry["key"]
+                self.bakedTexts[(fontPath, size, text, antialias, tuple(color))] = surface
+
+        return len(index)
+
+
+class SoundPool(object):
+    """
+    This class plays the sound effects. init() starts the mixer and decodes every effect once, and play() hands an
+    effect to an idle channel, or to the one that has been playing the longest if they are all busy, so effects that
+    overlap do not cut each other off. Until init() has succeeded play() does nothing, which is how the game runs
+    without audio: the mixer is never started.
+    """
+
+    def __init__(self, channels=4):
+        """
+        Creates a pool with no sounds.
+
+        :param channels: Number of effects that can play at the same time
+        """
+        self.channelCount = channels
+        self.sounds = {}  # path -> pygame.mixer.Sound
+        self.enabled = False  # True once the mixer has started
+
+    def init(self, effects=EFFECTS):
+        """
+        Starts the mixer and decodes the effects, unless it has already been done.
+
+        :param effects: dict of path -> volume of the effects to load
+        :return: True if sound is on, False if the mixer could not start (no audio device)
+        """
+        if self.enabled:
+            return True
+
+        try:
+            pygame.mixer.pre_init(buffer=512)  # Small buffer, so effects start right away
+            pygame.mixer.init()
+        except pygame.error:
+            return False
+
+        pygame.mixer.set_num_channels(self.channelCount)
+
+        for path, volume in effects.items():
+            sound = pygame.mixer.Sound(path)
+            sound.set_volume(volume)
+            self.sounds[path] = sound
+
+        self.enabled = True
+        return True
+
+    def play(self, path):
+        """
+        Plays an effect that init() has loaded, does nothing in no-audio mode.
+
+        :param path: Path of the effect
+        """
+        sound = self.sounds.get(path)
+
+        if sound is not None:
+            pygame.mixer.find_channel(True).play(sound)  # An idle channel, or else the longest playing one
+
+
+assets = AssetCache()  # Cache used by every screen
+sounds = SoundPool()  # Sound effects of every screen
@@ -0,0 +1,330 @@
+# -*- coding: UTF-8 -*-
+"""
+Autopilot bot.
+
+The autopilot follows a Hamiltonian cycle of the board, a closed path through every cell, and takes shortcuts towards
+the snack when they are provably safe. Every move goes forward along the cycle without passing the tail, so the body
+always lies along the cycle in order from tail to head. Eating never moves the tail back (addSquare() puts back the
+cell the tail just left), but the cell ahead of the head still has to be free, and moving into the old tail's cell is
+a hit. Without gaps in the body every free cell, the snack included, lies between the head and the tail, so the next
+cell of the cycle is always free. A shortcut leaves a gap of free cells behind the head, and until the tail has passed
+it only eating shrinks the room ahead of the head, by one cell per snack. Those snacks are eaten on cells that are
+free or covered by the body now, so a shortcut is only taken if it leaves more free cells ahead of the head than that,
+and the snake never traps itself whatever the snacks do. Shortcuts are picked with a BFS distance map from the snack
+around the body. The map is built once per snack and then updated as the body moves: a tick only blocks the new head
+and frees the old tail, which changes the distances of a few cells rather than the whole board.
+
+Use it headless as a policy for SnakeEngine (rollout.py --policy autopilot), or from the main menu. checkBoards() plays
+small boards of every shape to a win, run the module to check the autopilot after a change:
+    python autopilot.py
+"""
+import argparse
+import heapq
+from collections import deque
+
+from snakeEngine import VELOCITIES, Board, SnakeEngine
+
+
+class DistanceMap(object):
+    """
+    This class keeps the BFS distance from a target cell to every cell of a board, going around blocked cells and
+    wrapping around the edges like the snake does. Cells are numbered y * cols + x.
+    """
+
+    def __init__(self, cols, rows):
+        """
+        Creates a map with nothing reachable.
+
+        :param cols: Number of cells across
+        :param rows: Number of cells down
+        """
+        self.cols = cols
+        self.rows = rows
+        self.unreachable = cols * rows  # More than any real distance
+        self.dist = [self.unreachable] * (cols * rows)
+        self.blocked = bytearray(cols * rows)
+        self.target = None
+        # Neighbours of every cell, towards UP, LEFT, DOWN and RIGHT
+        self.neighbours = [tuple(((i % cols + dX) % cols) + ((i // cols + dY) % rows) * cols for dX, dY in VELOCITIES)
+                           for i in range(cols * rows)]
+
+    def reset(self, target, blocked):
+        """
+        Recomputes the whole map.
+
+        :param target: Cell the distances are measured to
+        :param blocked: Cells that can not be entered
+        """
+        unreachable = self.unreachable
+        dist = self.dist = [unreachable] * len(self.dist)
+        self.blocked = bytearray(len(self.dist))
+        self.target = target
+
+        for i in blocked:
+            self.blocked[i] = 1
+
+        dist[target] = 0
+        queue = deque([target])
+        neighbours = self.neighbours
+        isBlocked = self.blocked
+
+        while queue:
+            i = queue.popleft()
+            step = dist[i] + 1
+
+            for j in neighbours[i]:
+                if dist[j] == unreachable and not isBlocked[j]:
+                    dist[j] = step
+                    queue.append(j)
+
+    def block(self, cell):
+        """
+        Blocks a cell. The cells whose every shortest path went through it are invalidated layer by layer, then given
+        their new distances from the cells around them that kept theirs.
+
+        :param cell: The cell
+        """
+        if self.blocked[cell]:
+            return
+
+        self.blocked[cell] = 1
+        dist = self.dist
+        unreachable = self.unreachable
+
+        if dist[cell] == unreachable:
+            return
+
+        neighbours = self.neighbours
+        isBlocked = self.blocked
+        lost = [cell]  # Cells that lost their distance
+        queue = deque((j, dist[cell] + 1) for j in neighbours[cell])
+        dist[cell] = unreachable
+
+        while queue:
+            i, d = queue.popleft()
+
+            if dist[i] != d or isBlocked[i]:  # Not a cell that depended on a lost one, or already lost
+                continue
+
+            if any(dist[j] == d - 1 for j in neighbours[i]):  # Still has a shortest path
+                continue
+
+            dist[i] = unreachable
+            lost.append(i)
+            queue.extend((j, d + 1) for j in neighbours[i])
+
+        heap = []
+
+        for i in lost:
+            if not isBlocked[i]:
+                d = min(dist[j] for j in neighbours[i]) + 1
+
+                if d < unreachable:
+                    dist[i] = d
+                    heap.append((d, i))
+
+        heapq.heapify(heap)
+
+        while heap:
+            d, i = heapq.heappop(heap)
+
+            if d != dist[i]:
+                continue
+
+            for j in neighbours[i]:
+                if d + 1 < dist[j] and not isBlocked[j]:
+                    dist[j] = d + 1
+                    heapq.heappush(heap, (d + 1, j))
+
+    def unblock(self, cell):
+        """
+        Frees a cell and spreads the shorter paths through it.
+
+        :param cell: The cell
+        """
+        if not self.blocked[cell]:
+            return
+
+        self.blocked[cell] = 0
+        dist = self.dist
+        neighbours = self.neighbours
+        isBlocked = self.blocked
+        dist[cell] = 0 if cell == self.target else min(min(dist[j] for j in neighbours[cell]) + 1, self.unreachable)
+
+        if dist[cell] == self.unreachable:
+            return
+
+        queue = deque([cell])
+
+        while queue:
+            i = queue.popleft()
+            step = dist[i] + 1
+
+            for j in neighbours[i]:
+                if step < dist[j] and not isBlocked[j]:
+                    dist[j] = step
+                    queue.append(j)
+
+
+class Autopilot(object):
+    """
+    This class is the autopilot, a policy for SnakeEngine: call it with the engine before every tick to get the
+    direction to move in. One Autopilot follows one engine at a time and notices when its game is reset.
+    """
+
+    def __init__(self):
+        """
+        Creates the autopilot.
+        """
+        self.engine = None  # Engine being played
+        self.board = None
+        self.distances = None  # DistanceMap from the snack
+        self.ticks = None  # engine.ticks on the last call
+        self.snack = None  # Snack on the last call
+        self.tail = None  # Tail on the last call
+
+    def __call__(self, engine):
+        """
+        Picks the direction for the next tick.
+
+        :param engine: SnakeEngine being played
+        :return: UP, LEFT, DOWN or RIGHT
+        """
+        self.follow(engine)
+        cols, rows, cellSize = engine.board
+        area = cols * rows
+        head = engine.body[0]
+        tail = self.onBoardTail(engine)
+        headIndex = self.cycleIndex(head)
+        toTail = (self.cycleIndex(tail) - headIndex) % area or area  # Cycle cells from the head to the tail
+        toSnack = (self.cycleIndex(engine.snack) - headIndex) % area
+
+        # How far along the cycle the head may jump: the cells it skips and the tail's cell are out of reach, and the
+        # rest must hold more cells than the snake can eat before the tail gets past the gaps. Those are the free snack
+        # cells and the cells the body covers now, which it frees on the way. Moving one cell is always safe.
+        allowed = max(1, min(toTail - 2 - len(engine.free) - len(engine.body), toSnack))
+
+        dist = self.distances.dist
+        best = None
+        bestKey = None
+
+        for direction, (dX, dY) in enumerate(VELOCITIES):
+            cell = ((head[0] + dX) % cols, (head[1] + dY) % rows)
+
+            if cell in engine.occupied:  # The tail's cell too, moving into it ends the game
+                continue
+
+            jump = (self.cycleIndex(cell) - headIndex) % area
+
+            if not 0 < jump <= allowed:
+                continue
+
+            key = (dist[cell[1] * cols + cell[0]], -jump)  # Closest to the snack, then furthest along the cycle
+
+            if bestKey is None or key < bestKey:
+                best = direction
+                bestKey = key
+
+        if best is None:  # The next cell of the cycle is always free, unless the game was not played by the autopilot
+            raise RuntimeError("the autopilot is trapped, the body does not lie along its cycle")
+
+        return best
+
+    def follow(self, engine):
+        """
+        Brings the distance map up to date with the engine: rebuilt for a new game or a new snack, otherwise updated
+        for the one tick played since the last call.
+
+        :param engine: SnakeEngine being played
+        """
+        cols, rows, cellSize = engine.board
+
+        if engine is not self.engine or engine.board != self.board:
+            self.engine = engine
+            self.board = engine.board
+            self.distances = DistanceMap(cols, rows)
+            self.ticks = None
+
+        if engine.ticks != (self.ticks or 0) + 1 or engine.snack != self.snack or self.ticks is None:
+            blocked = [y * cols + x for x, y in engine.occupied if 0 <= x < cols and 0 <= y < rows]
+            snackX, snackY = engine.snack
+            self.distances.reset(snackY * cols + snackX, blocked)
+        else:
+            headX, headY = engine.body[0]
+            self.distances.block(headY * cols + headX)
+            tailX, tailY = self.tail
+
+            if self.tail not in engine.occupied and 0 <= tailX < cols and 0 <= tailY < rows:
+                self.distances.unblock(tailY * cols + tailX)
+
+        self.ticks = engine.ticks
+        self.snack = engine.snack
+        self.tail = engine.body[-1]
+
+    def onBoardTail(self, engine):
+        """
+        :param engine: SnakeEngine being played
+        :return: The last cell of the body on the board (a tail just added by addSquare() can be outside it)
+        """
+        cols, rows, cellSize = engine.board
+
+        for x, y in reversed(engine.body):
+            if 0 <= x < cols and 0 <= y < rows:
+                return x, y
+
+    def cycleIndex(self, cell):
+        """
+        Position of a cell along the Hamiltonian cycle. The cycle runs back and forth along the rows over every column
+        but the first, then back up the first column (wrapping around the right edge if the number of rows is odd).
+
+        :param cell: (x, y) cell on the board
+        :return: Its index along the cycle, 0 to cols * rows - 1
+        """
+        x, y = cell
+        cols, rows = self.board.cols, self.board.rows
+
+        if x == 0:
+            return (cols - 1) * rows + (rows - 1 - y)
+
+        return y * (cols - 1) + (x - 1 if y % 2 == 0 else cols - 1 - x)
+
+
+def checkBoards(sizes=range(4, 12), seeds=range(3), maxTicks=1000000):
+    """
+    Plays the autopilot on every board shape from the sizes, with every seed, and lists the games it did not win.
+
+    :param sizes: Numbers of columns and of rows to try
+    :param seeds: Seeds to play each board with
+    :param maxTicks: Ticks after which a game counts as lost
+    :return: List of (cols, rows, seed, score) for the games not won, empty if every game was won
+    """
+    lost = []
+
+    for cols in sizes:
+        for rows in sizes:
+            for seed in seeds:
+                engine = SnakeEngine(seed, Board(cols, rows))
+                pilot = Autopilot()
+
+                while not engine.done and engine.ticks < maxTicks:
+                    engine.advance(pilot(engine))
+
+                if not engine.won:
+                    lost.append((cols, rows, seed, engine.score))
+
+    return lost
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checks that the autopilot wins on every small board.")
+    parser.add_argument("--min-size", type=int, default=4)
+    parser.add_argument("--max-size", type=int, default=11)
+    parser.add_argument("--seeds", type=int, default=3)
+    args = parser.parse_args()
+    lost = checkBoards(range(args.min_size, args.max_size + 1), range(args.seeds))
+
+    for cols, rows, seed, score in lost:
+        print("Lost on %dx%d with seed %d, score %d" % (cols, rows, seed, score))
+
+    print("%d games lost" % len(lost))
+    raise SystemExit(1 if lost else 0)
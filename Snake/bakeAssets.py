@@ -0,0 +1,55 @@
+# -*- coding: UTF-8 -*-
+"""
+Builds the pre-baked asset bundle.
+
+Draws the first frame of every screen with SDL's dummy video driver, so the AssetCache loads every image and renders
+every fixed text the screens use, then writes them all to one bundle file. The game loads the bundle at startup if it
+exists (data/assets.bundle by default, or the SNAKE_ASSET_BUNDLE path), so the first frames need no PNG decoding or
+text rendering. Rebuild it whenever the images, the font or the texts change.
+
+Run it from the Snake folder:
+    python bakeAssets.py --output data/assets.bundle
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Must be set before pygame is imported
+os.environ["SNAKE_AUDIO"] = "0"  # Sounds are not part of the bundle
+os.environ["SNAKE_ASSET_BUNDLE"] = ""  # Starts from an empty cache rather than an older bundle
+
+import argparse
+
+import pygame
+
+from assets import assets
+from snakeGame import AUTOPILOT_DIFF, gameOver, helpWindow, highScoreWin, mainMenu, openWindow
+
+# Screens and their arguments, drawn once each: "Game Over" and "You Win!", with and without the high score
+SCREENS = ((mainMenu, ()), (helpWindow, ()), (highScoreWin, ()), (gameOver, (0, 100)),
+           (gameOver, (0, AUTOPILOT_DIFF, True, True)))
+
+
+def bake(path):
+    """
+    Draws every screen once and writes what they loaded to a bundle.
+
+    :param path: Path of the bundle
+    :return: Number of surfaces written
+    """
+    window = openWindow()
+
+    for screen, args in SCREENS:
+        pygame.event.post(pygame.event.Event(pygame.QUIT))  # Leaves the screen right after its first frame
+        screen(window, *args)
+
+    count = assets.saveBundle(path)
+    pygame.quit()
+
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds the pre-baked asset bundle.")
+    parser.add_argument("--output", default="data/assets.bundle")
+    args = parser.parse_args()
+    count = bake(args.output)
+    print("Wrote %d surfaces (%d bytes) to %s" % (count, os.path.getsize(args.output), args.output))
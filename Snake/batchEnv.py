@@ -0,0 +1,197 @@
+# -*- coding: UTF-8 -*-
+"""
+Vectorized Snake environment.
+
+BatchSnakeEnv runs many games of Snake side by side, with every board stored in NumPy arrays so one call to step()
+advances all of them. The rules are the ones in snakeEngine.py (and so in snakeGame.py): wrap-around at the window
+edges, backing into the old tail cell is a hit, a new tail goes behind the current one without wrapping, and snacks
+spawn uniformly on the free cells of the 28x28 interior.
+"""
+import numpy as np
+
+from snakeEngine import COLS, ROWS, SNACK_MIN, SNACK_MAX, START, RIGHT, VELOCITIES, State
+
+PADDED_COLS = COLS + 2  # A border of one cell all around, for new tails placed outside the window
+PADDED_CELLS = PADDED_COLS * (ROWS + 2)
+CAPACITY = COLS * ROWS + 1  # Size of each body ring buffer, more than the longest possible snake
+VEL_X = np.array([v[0] for v in VELOCITIES], dtype=np.int32)
+VEL_Y = np.array([v[1] for v in VELOCITIES], dtype=np.int32)
+
+
+def toCell(x, y):
+    """
+    Converts coordinates into an index on the padded board.
+
+    :param x: X coordinate(s), from -1 to COLS
+    :param y: Y coordinate(s), from -1 to ROWS
+    :return: The cell index(es)
+    """
+    return (y + 1) * PADDED_COLS + (x + 1)
+
+
+def fromCell(cell):
+    """
+    Converts padded board indexes back into coordinates.
+
+    :param cell: Cell index(es)
+    :return: (x, y) coordinate(s)
+    """
+    return cell % PADDED_COLS - 1, cell // PADDED_COLS - 1
+
+
+class BatchSnakeEnv(object):
+    """
+    This class holds N games of Snake. Every snake is a ring buffer of padded cell indexes (self.body) with a parallel
+    ring buffer of directions (self.dirs), and every board has an occupancy grid counting the Squares on each cell.
+    """
+
+    def __init__(self, n, seed=None):
+        """
+        Creates the environment and starts every game.
+
+        :param n: Number of games to run side by side
+        :param seed: Seed for the NumPy generator used to place snacks
+        """
+        self.n = n
+        self.rows = np.arange(n)  # Row index of every game, used for fancy indexing
+        self.body = np.zeros((n, CAPACITY), dtype=np.int32)
+        self.dirs = np.zeros((n, CAPACITY), dtype=np.int8)
+        self.occupied = np.zeros((n, PADDED_CELLS), dtype=np.uint8)
+        self.headPtr = np.zeros(n, dtype=np.int64)  # Slot of the head in each ring buffer
+        self.length = np.zeros(n, dtype=np.int64)
+        self.headX = np.zeros(n, dtype=np.int64)
+        self.headY = np.zeros(n, dtype=np.int64)
+        self.direction = np.zeros(n, dtype=np.int64)
+        self.snack = np.zeros(n, dtype=np.int64)  # Padded cell index of each snack
+        self.score = np.zeros(n, dtype=np.int64)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.won = np.zeros(n, dtype=bool)
+        self.finalScore = np.zeros(n, dtype=np.int64)  # Score of the last finished game in each slot
+        self.finalTicks = np.zeros(n, dtype=np.int64)  # Length in ticks of the last finished game in each slot
+        xs, ys = np.meshgrid(np.arange(SNACK_MIN, SNACK_MAX + 1), np.arange(SNACK_MIN, SNACK_MAX + 1))
+        self.snackCells = toCell(xs.ravel(), ys.ravel())  # Cells a snack can spawn in, row by row
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self, seed=None):
+        """
+        Starts a new game on every board.
+
+        :param seed: Reseeds the generator if given
+        :return: The starting State, with one entry per game
+        """
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+
+        self.resetGames(self.rows)
+
+        return self.state()
+
+    def resetGames(self, games):
+        """
+        Starts a new game on some of the boards.
+
+        :param games: Index array of the games to restart
+        """
+        start = toCell(*START)
+        self.occupied[games] = 0
+        self.headPtr[games] = 0
+        self.length[games] = 1
+        self.headX[games] = START[0]
+        self.headY[games] = START[1]
+        self.body[games, 0] = start
+        self.dirs[games, 0] = RIGHT
+        self.occupied[games, start] = 1
+        self.direction[games] = RIGHT
+        self.score[games] = 0
+        self.ticks[games] = 0
+        self.won[games] = False
+        self.snack[games], _ = self.placeSnacks(games)
+
+    def placeSnacks(self, games):
+        """
+        Picks a free snack cell uniformly at random on some of the boards.
+
+        :param games: Index array of the games that need a snack
+        :return: (cells, placed), where placed is False for boards with no free cell left
+        """
+        free = self.occupied[games][:, self.snackCells] == 0
+        counts = free.sum(axis=1)
+        picks = (self.rng.random(len(games)) * counts).astype(np.int64)  # Which free cell, counted row by row
+        index = (np.cumsum(free, axis=1) > picks[:, None]).argmax(axis=1)
+
+        return self.snackCells[index], counts > 0
+
+    def state(self):
+        """
+        Builds a State of arrays describing every game.
+
+        :return: State whose head and snack are (n, 2) arrays of cells and the other fields are (n,) arrays
+        """
+        snackX, snackY = fromCell(self.snack)
+
+        return State(np.stack([self.headX, self.headY], axis=1), self.direction.copy(),
+                     np.stack([snackX, snackY], axis=1), self.length.copy(), self.score.copy(), self.ticks.copy())
+
+    def step(self, actions):
+        """
+        Advances every game by one tick. Finished games are restarted straight away; their final score and length
+        are left in self.finalScore and self.finalTicks.
+
+        :param actions: (n,) array of UP, LEFT, DOWN or RIGHT, or -1 to keep moving in the current direction
+        :return: (state, rewards, dones), where rewards counts the snacks eaten by each game during the tick
+        """
+        rows = self.rows
+        actions = np.asarray(actions)
+
+        if actions.size and (actions.min() < -1 or actions.max() > 3):  # Checked once for the whole batch
+            bad = actions[(actions < -1) | (actions > 3)][0]
+            raise ValueError("actions should be -1 (keep moving) or 0 to 3, not " + str(bad))
+        self.direction = np.where(actions >= 0, actions, self.direction)
+        x = (self.headX + VEL_X[self.direction]) % COLS  # Same boundaries as Snake.move()
+        y = (self.headY + VEL_Y[self.direction]) % ROWS
+        head = toCell(x, y)
+
+        # Every Square moves up one place, so the tail's cell is vacated
+        tailPtr = (self.headPtr - self.length + 1) % CAPACITY
+        tail = self.body[rows, tailPtr]
+        self.occupied[rows, tail] -= 1
+
+        # Backing into the old tail cell counts as a hit, as does running into any other body part
+        dead = (head == tail) | (self.occupied[rows, head] > 0)
+
+        self.headPtr = (self.headPtr + 1) % CAPACITY
+        self.body[rows, self.headPtr] = head
+        self.dirs[rows, self.headPtr] = self.direction
+        self.occupied[rows, head] += 1
+        self.headX = x
+        self.headY = y
+        self.ticks += 1
+
+        ate = ~dead & (head == self.snack)
+        eaters = np.flatnonzero(ate)
+
+        if eaters.size:
+            # Snake.addSquare() puts the new tail behind the current one without wrapping it around the window
+            tailPtr = (self.headPtr[eaters] - self.length[eaters] + 1) % CAPACITY
+            tailDir = self.dirs[eaters, tailPtr]
+            newTail = self.body[eaters, tailPtr] - VEL_X[tailDir] - VEL_Y[tailDir] * PADDED_COLS
+            tailPtr = (tailPtr - 1) % CAPACITY
+            self.body[eaters, tailPtr] = newTail
+            self.dirs[eaters, tailPtr] = tailDir
+            self.occupied[eaters, newTail] += 1
+            self.length[eaters] += 1
+            self.score[eaters] += 1
+            self.snack[eaters], placed = self.placeSnacks(eaters)
+            self.won[eaters] = ~placed  # The board is full, so the game is won
+
+        dones = dead | self.won
+        rewards = ate.astype(np.int64)
+        finished = np.flatnonzero(dones)
+
+        if finished.size:
+            self.finalScore[finished] = self.score[finished]
+            self.finalTicks[finished] = self.ticks[finished]
+            self.resetGames(finished)
+
+        return self.state(), rewards, dones
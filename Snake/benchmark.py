@@ -0,0 +1,422 @@
+# -*- coding: UTF-8 -*-
+"""
+Benchmarks for the game's hot paths.
+
+Every benchmark runs on fixed snakes and seeds and keeps the best of several repeats, so runs on the same machine are
+comparable. Results are written as JSON, one entry per metric, and can be compared against a saved baseline to catch
+regressions. Drawing uses SDL's dummy video driver unless SDL_VIDEODRIVER is already set. Everything runs on the
+original 30 x 30 board, whatever SNAKE_BOARD says, except for one spawning benchmark on a LARGE_BOARD.
+
+Run it from the Snake folder:
+    python benchmark.py --output baseline.json
+    python benchmark.py --compare baseline.json --tolerance 0.10
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Must be set before pygame is imported
+
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+
+import pygame
+
+from autopilot import Autopilot
+from gameState import GameState
+from snakeEngine import COLS, DEFAULT_BOARD, ROWS, SNACK_MAX, SNACK_MIN, Board, GameRng, SnakeEngine
+from snakeGame import BitboardSnake, DirtyRenderer, Snake, Square, goodSnackPos, newSnack, redraw, snakeHit
+
+LENGTHS = (1, 10, 100, 400, 800)  # Snake lengths the per-tick benchmarks run at
+OCCUPANCIES = (0.0, 0.25, 0.5, 0.75, 0.9, 0.99)  # Share of the snack cells covered by the snake when spawning
+PILOT_LENGTHS = (1, 100, 400, 700)  # Snake lengths the autopilot is measured at
+LARGE_BOARD = Board(1000, 1000)  # Board the engine's spawning is also measured on, to show it does not grow with it
+LARGE_OCCUPANCIES = (0.0, 0.5, 0.99)  # Share of the LARGE_BOARD's snack cells covered when spawning
+
+
+class CountingRng(GameRng):
+    """
+    GameRng that counts its draws, to measure how many tries newSnack() needs.
+    """
+
+    def __init__(self, seed=None):
+        """
+        Creates the generator.
+
+        :param seed: Seed, as for GameRng
+        """
+        GameRng.__init__(self, seed)
+        self.draws = 0
+
+    def below(self, n):
+        """
+        Counts the draw and makes it.
+
+        :param n: Upper bound
+        :return: A number from 0 to n - 1
+        """
+        self.draws += 1
+        return GameRng.below(self, n)
+
+
+def buildSnake(length, snakeClass=Snake):
+    """
+    Lays a snake out over the board, head last. The cells snacks can spawn in are covered first, row by row, so a
+    snake of length (SNACK_MAX - SNACK_MIN + 1) ** 2 leaves no room for a snack; longer snakes go on to the border.
+    The benchmarks only touch the ends of the snake and the cells it covers, so the body does not have to be connected.
+
+    :param length: Number of Squares in the snake (1 to COLS * ROWS)
+    :param snakeClass: Snake or BitboardSnake
+    :return: The Snake
+    """
+    inner = range(SNACK_MIN, SNACK_MAX + 1)
+    path = [(x, y) for y in inner for x in inner]
+    path += [(x, y) for y in range(ROWS) for x in range(COLS) if x not in inner or y not in inner]
+    path = path[:length]
+    headX, headY = path[-1]
+    snake = snakeClass(DEFAULT_BOARD)
+    snake.reset(headX * 20, headY * 20)
+
+    for x, y in reversed(path[:-1]):
+        snake.body.append(Square(x * 20, y * 20, (255, 255, 255)))
+        snake.occupy(x * 20, y * 20)
+
+    return snake
+
+
+def best(func, number, repeat):
+    """
+    Times a function.
+
+    :param func: Function to time
+    :param number: Calls per repeat
+    :param repeat: Number of repeats
+    :return: Seconds per call in the fastest repeat
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def metric(value, unit, better):
+    """
+    :param value: Measured value
+    :param unit: Unit of the value
+    :param better: "higher" or "lower", whichever way is an improvement
+    :return: A metric entry for the results
+    """
+    return {"value": value, "unit": unit, "better": better}
+
+
+def benchMove(lengths, ticks, repeat):
+    """
+    Measures Snake.move(), the work done on every tick.
+
+    :param lengths: Snake lengths to measure at
+    :param ticks: Moves per repeat
+    :param repeat: Number of repeats
+    :return: dict of metrics
+    """
+    results = {}
+
+    for length in lengths:
+        snake = buildSnake(length)
+
+        def run():
+            vX, vY = 20, 0
+
+            for _ in range(ticks):
+                vX, vY, flag = snake.move(vX, vY)
+
+        seconds = best(run, 1, repeat)
+        results["move.ticksPerSecond[" + str(length) + "]"] = metric(ticks / seconds, "ticks/s", "higher")
+
+    return results
+
+
+def benchLookups(lengths, calls, repeat):
+    """
+    Measures snakeHit() and goodSnackPos(), which run on every tick and every spawn.
+
+    :param lengths: Snake lengths to measure at
+    :param calls: Calls per repeat
+    :param repeat: Number of repeats
+    :return: dict of metrics
+    """
+    results = {}
+
+    for length in lengths:
+        snake = buildSnake(length)
+        tail = snake.body[-1]
+
+        seconds = best(lambda: snakeHit(snake), calls, repeat)
+        results["snakeHit.ns[" + str(length) + "]"] = metric(seconds * 1e9, "ns", "lower")
+
+        seconds = best(lambda: goodSnackPos(snake, tail.posX, tail.posY), calls, repeat)  # A covered position
+        results["goodSnackPos.ns[" + str(length) + "]"] = metric(seconds * 1e9, "ns", "lower")
+
+    return results
+
+
+def benchSpawning(occupancies, snacks, repeat):
+    """
+    Measures newSnack() as the board fills up, along with how many draws it takes per snack.
+
+    :param occupancies: Shares of the cells snacks spawn in to cover with the snake
+    :param snacks: Snacks spawned per repeat
+    :param repeat: Number of repeats
+    :return: dict of metrics
+    """
+    results = {}
+
+    for occupancy in occupancies:
+        snake = buildSnake(max(1, round(occupancy * (SNACK_MAX - SNACK_MIN + 1) ** 2)))
+        rng = CountingRng(0)
+        name = "[" + str(occupancy) + "]"
+
+        seconds = best(lambda: newSnack(snake, rng), snacks, repeat)
+        results["newSnack.ns" + name] = metric(seconds * 1e9, "ns", "lower")
+        results["newSnack.retries" + name] = metric(rng.draws / (snacks * repeat) - 1, "draws", "lower")
+
+    return results
+
+
+def benchLargeSpawning(board, occupancies, snacks, repeat):
+    """
+    Measures the engine's snack pick (FreeCells.choice()) on a large board as it fills up.
+
+    :param board: Board to spawn on
+    :param occupancies: Shares of the cells snacks spawn in to cover, row by row
+    :param snacks: Snacks spawned per repeat
+    :param repeat: Number of repeats
+    :return: dict of metrics
+    """
+    results = {}
+    size = str(board.cols) + "x" + str(board.rows)
+
+    for occupancy in occupancies:
+        free = board.freeCells()
+        rng = GameRng(0)
+
+        for i in range(round(occupancy * free.size)):
+            free.remove((free.minX + i % free.width, free.minY + i // free.width))
+
+        seconds = best(lambda: free.choice(rng), snacks, repeat)
+        results["choice.ns[" + size + ", " + str(occupancy) + "]"] = metric(seconds * 1e9, "ns", "lower")
+
+    return results
+
+
+def benchBitboard(lengths, calls, repeat):
+    """
+    Measures the BitboardSnake's free space queries: counting the free cells and flood filling from the head.
+
+    :param lengths: Snake lengths to measure at
+    :param calls: Calls per repeat
+    :param repeat: Number of repeats
+    :return: dict of metrics
+    """
+    results = {}
+
+    for length in lengths:
+        snake = buildSnake(length, BitboardSnake)
+        head = (snake.head.posX // 20, snake.head.posY // 20)
+        name = "[" + str(length) + "]"
+
+        seconds = best(snake.bits.freeCount, calls * 10, repeat)
+        results["bitboard.freeCount.ns" + name] = metric(seconds * 1e9, "ns", "lower")
+
+        seconds = best(lambda: snake.bits.reachableCount(head), calls, repeat)
+        results["bitboard.reachable.us" + name] = metric(seconds * 1e6, "us", "lower")
+
+    return results
+
+
+def benchAutopilot(lengths, ticks, repeat):
+    """
+    Measures the Autopilot playing the engine. The snakes are grown by the autopilot itself in a real game, since it
+    needs a body laid along its cycle, and every repeat restarts from the same point of that game.
+
+    :param lengths: Snake lengths to measure at
+    :param ticks: Ticks per repeat
+    :param repeat: Number of repeats
+    :return: dict of metrics
+    """
+    results = {}
+    engine = SnakeEngine(0)
+    pilot = Autopilot()
+
+    for length in lengths:
+        while len(engine.body) < length:
+            engine.advance(pilot(engine))
+
+        saved = (list(engine.body), list(engine.dirs), engine.direction, engine.snack, engine.score, engine.ticks)
+        rngState = engine.rng.state
+
+        def run():
+            engine.rebuild(*saved)
+            engine.rng.state = rngState
+
+            for _ in range(ticks):
+                if engine.done:
+                    break
+
+                engine.advance(pilot(engine))
+
+        seconds = best(run, 1, repeat)
+        results["autopilot.ticksPerSecond[" + str(length) + "]"] = metric(ticks / seconds, "ticks/s", "higher")
+
+    return results
+
+
+def benchGameState(lengths, calls, repeat):
+    """
+    Measures a lookahead's inner loop on GameState: trying each direction with step() and taking it back with
+    unstep(). The snakes are grown by the autopilot, as in benchAutopilot().
+
+    :param lengths: Snake lengths to measure at
+    :param calls: step() and unstep() pairs per repeat
+    :param repeat: Number of repeats
+    :return: dict of metrics
+    """
+    results = {}
+    engine = SnakeEngine(0)
+    pilot = Autopilot()
+
+    for length in lengths:
+        while len(engine.body) < length:
+            engine.advance(pilot(engine))
+
+        state = GameState.fromEngine(engine)
+
+        def run():
+            for _ in range(calls // 4):
+                for direction in range(4):
+                    state.step(direction)
+                    state.unstep()
+
+        seconds = best(run, 1, repeat)
+        results["gameState.stepUnstepPerSecond[" + str(length) + "]"] = metric(calls // 4 * 4 / seconds, "pairs/s",
+                                                                              "higher")
+
+    return results
+
+
+def benchRedraw(window, lengths, frames, repeat):
+    """
+    Measures drawing a frame, both as a full redraw() and as the DirtyRenderer's repaint of one tick.
+
+    :param window: Window to draw on
+    :param lengths: Snake lengths to measure at
+    :param frames: Frames per repeat
+    :param repeat: Number of repeats
+    :return: dict of metrics
+    """
+    results = {}
+
+    for length in lengths:
+        snake = buildSnake(length)
+        snack = Square(14 * 20, 28 * 20, (111, 201, 129))
+        name = "[" + str(length) + "]"
+
+        seconds = best(lambda: redraw(window, snake, snack, length - 1), frames, repeat)
+        results["redraw.ms" + name] = metric(seconds * 1e3, "ms", "lower")
+
+        renderer = DirtyRenderer(window, DEFAULT_BOARD)
+        renderer.full(snake, snack, length - 1)
+
+        def tick():
+            snake.move(20, 0)
+            renderer.draw(snake, snack, length - 1)
+
+        seconds = best(tick, frames, repeat)
+        results["dirtyDraw.ms" + name] = metric(seconds * 1e3, "ms", "lower")
+
+    return results
+
+
+def runBenchmarks(quick=False):
+    """
+    Runs every benchmark.
+
+    :param quick: Runs fewer iterations, for a fast but noisier check
+    :return: dict with the environment the benchmarks ran in and their metrics
+    """
+    scale = 10 if quick else 1
+    pygame.display.init()  # No mixer: the sound effects are never loaded, so eating is silent
+    pygame.font.init()
+    window = pygame.display.set_mode((600, 600))
+    metrics = {}
+    metrics.update(benchMove(LENGTHS, 20000 // scale, 5))
+    metrics.update(benchLookups(LENGTHS, 200000 // scale, 5))
+    metrics.update(benchSpawning(OCCUPANCIES, 20000 // scale, 5))
+    metrics.update(benchLargeSpawning(LARGE_BOARD, LARGE_OCCUPANCIES, 20000 // scale, 5))
+    metrics.update(benchBitboard(LENGTHS, 2000 // scale, 5))
+    metrics.update(benchAutopilot(PILOT_LENGTHS, 2000 // scale, 5))
+    metrics.update(benchGameState(PILOT_LENGTHS, 200000 // scale, 5))
+    metrics.update(benchRedraw(window, LENGTHS, 200 // scale, 5))
+
+    return {
+        "python": sys.version.split()[0],
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "videoDriver": pygame.display.get_driver(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "metrics": metrics,
+    }
+
+
+def compare(baseline, results, tolerance=0.10):
+    """
+    Compares results against a baseline.
+
+    :param baseline: Results of an earlier runBenchmarks()
+    :param results: Results of runBenchmarks()
+    :param tolerance: Relative change in the wrong direction that counts as a regression (0.10 is 10%)
+    :return: List of (name, old value, new value, relative change, regressed) for the metrics in both
+    """
+    rows = []
+
+    for name, new in sorted(results["metrics"].items()):
+        old = baseline["metrics"].get(name)
+
+        if old is None:
+            continue
+
+        if old["value"]:
+            change = (new["value"] - old["value"]) / abs(old["value"])
+        else:
+            change = 0.0 if not new["value"] else float("inf")
+
+        worse = -change if new["better"] == "higher" else change
+        rows.append((name, old["value"], new["value"], change, worse > tolerance))
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the game's hot paths.")
+    parser.add_argument("--output", help="file to write the results to as JSON (printed if not given)")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--quick", action="store_true")
+    args = parser.parse_args()
+
+    results = runBenchmarks(args.quick)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    elif not args.compare:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as file:
+            rows = compare(json.load(file), results, args.tolerance)
+
+        for name, old, new, change, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print("%-28s %14.3f %14.3f %+8.1f%%%s" % (name, old, new, change * 100, flag))
+
+        if any(regressed for *_, regressed in rows):
+            sys.exit(1)
@@ -0,0 +1,228 @@
+# -*- coding: UTF-8 -*-
+"""
+Bitboard view of a snake's occupied cells.
+
+The occupied cells of the board are the bits of a single int, cell (x, y) being bit y * cols + x. Whole-board questions
+then become a handful of big-int operations instead of loops over the body: is a cell free, how many cells are free,
+which neighbours of a set of cells are free (a shift per direction, wrapping around the board like Snake.move()), and
+how much free space can be reached from a cell (a flood fill made of repeated shifts).
+
+BitboardEngine keeps a Bitboard in step with a SnakeEngine, and snakeGame.BitboardSnake does the same for the game's
+Snake.
+"""
+from snakeEngine import DEFAULT_BOARD, DOWN, LEFT, RIGHT, UP, SnakeEngine, popcount
+
+
+class Bitboard(object):
+    """
+    This class holds the occupied cells of a board as the bits of self.mask.
+    """
+
+    def __init__(self, board=DEFAULT_BOARD, cells=()):
+        """
+        Creates a bitboard.
+
+        :param board: Board the cells are on
+        :param cells: Cells to start occupied
+        """
+        cols, rows = board.cols, board.rows
+        self.cols = cols
+        self.rows = rows
+        self.area = cols * rows
+        self.full = (1 << self.area) - 1  # Every cell of the board
+        self.firstCol = self.full // ((1 << cols) - 1)  # Bit 0 of every row: 1 + 2^cols + 2^(2 * cols) + ...
+        self.lastCol = self.firstCol << (cols - 1)
+        self.firstRow = (1 << cols) - 1
+        self.lastRow = self.firstRow << (self.area - cols)
+        self.mask = 0  # Occupied cells
+
+        for cell in cells:
+            self.add(cell)
+
+    def index(self, cell):
+        """
+        :param cell: (x, y) cell
+        :return: Bit number of the cell, or None if it is outside the board
+        """
+        x, y = cell
+
+        if 0 <= x < self.cols and 0 <= y < self.rows:
+            return y * self.cols + x
+
+        return None
+
+    def bit(self, cell):
+        """
+        :param cell: (x, y) cell on the board
+        :return: Mask with only that cell set
+        """
+        x, y = cell
+        return 1 << (y * self.cols + x)
+
+    def add(self, cell):
+        """
+        Marks a cell as occupied. Cells outside the board (a tail just added by addSquare()) are ignored.
+
+        :param cell: (x, y) cell
+        """
+        i = self.index(cell)
+
+        if i is not None:
+            self.mask |= 1 << i
+
+    def discard(self, cell):
+        """
+        Marks a cell as free. Cells outside the board are ignored.
+
+        :param cell: (x, y) cell
+        """
+        i = self.index(cell)
+
+        if i is not None:
+            self.mask &= ~(1 << i)
+
+    def isFree(self, cell):
+        """
+        :param cell: (x, y) cell on the board
+        :return: True if the cell is not occupied
+        """
+        x, y = cell
+        return not self.mask >> (y * self.cols + x) & 1
+
+    def freeCount(self):
+        """
+        :return: Number of free cells on the board
+        """
+        return self.area - popcount(self.mask)
+
+    def shift(self, mask, direction):
+        """
+        Moves every cell of a mask one step, wrapping around the edges of the board.
+
+        :param mask: Cells to move
+        :param direction: UP, LEFT, DOWN or RIGHT
+        :return: Mask of the cells one step away from those of the mask in that direction
+        """
+        if direction == RIGHT:
+            return (mask & ~self.lastCol) << 1 | (mask & self.lastCol) >> (self.cols - 1)
+        elif direction == LEFT:
+            return (mask & ~self.firstCol) >> 1 | (mask & self.firstCol) << (self.cols - 1)
+        elif direction == DOWN:
+            return (mask & ~self.lastRow) << self.cols | mask >> (self.area - self.cols)
+        else:
+            return mask >> self.cols | (mask & self.firstRow) << (self.area - self.cols)
+
+    def neighbours(self, mask):
+        """
+        :param mask: Cells to look around
+        :return: Tuple of 4 masks, the cells one step from the mask towards UP, LEFT, DOWN and RIGHT
+        """
+        return tuple(self.shift(mask, direction) for direction in (UP, LEFT, DOWN, RIGHT))
+
+    def freeDirections(self, cell):
+        """
+        :param cell: (x, y) cell on the board, usually the head
+        :return: List of the directions whose neighbouring cell is free
+        """
+        bit = self.bit(cell)
+        occupied = self.mask
+
+        return [direction for direction in (UP, LEFT, DOWN, RIGHT) if not self.shift(bit, direction) & occupied]
+
+    def reachable(self, cell, blocked=None):
+        """
+        Flood fills the free cells that can be reached from a cell.
+
+        :param cell: (x, y) cell to start from, it does not have to be free (e.g. the head)
+        :param blocked: Mask of cells that can not be entered, the occupied cells if None
+        :return: Mask of the reachable cells, the start included
+        """
+        start = self.bit(cell)
+        passable = self.full & ~(self.mask if blocked is None else blocked) | start
+        region = start
+        shift = self.shift
+
+        while True:
+            grown = (region | shift(region, UP) | shift(region, LEFT) | shift(region, DOWN) |
+                     shift(region, RIGHT)) & passable
+
+            if grown == region:
+                return region
+
+            region = grown
+
+    def reachableCount(self, cell, blocked=None):
+        """
+        :param cell: (x, y) cell to start from
+        :param blocked: Mask of cells that can not be entered, the occupied cells if None
+        :return: Number of free cells reachable from the cell, not counting the cell itself
+        """
+        return popcount(self.reachable(cell, blocked) & ~self.bit(cell))
+
+    def cells(self, mask):
+        """
+        Lists the cells of a mask.
+
+        :param mask: Mask of cells
+        :return: Generator of (x, y) cells, in bit order
+        """
+        while mask:
+            low = mask & -mask  # Lowest set bit
+            i = low.bit_length() - 1
+            yield i % self.cols, i // self.cols
+            mask ^= low
+
+
+class BitboardEngine(SnakeEngine):
+    """
+    SnakeEngine that keeps a Bitboard of the body in self.bits, for bots that ask about free space on every tick.
+    """
+
+    def reset(self, seed=None):
+        """
+        Starts a new game, see SnakeEngine.reset().
+
+        :param seed: Seed for the snack generator
+        :return: The starting State
+        """
+        state = SnakeEngine.reset(self, seed)
+        self.bits = Bitboard(self.board, self.occupied)
+
+        return state
+
+    def rebuild(self, body, dirs, direction, snack, score, ticks):
+        """
+        Puts the engine in the middle of a game, see SnakeEngine.rebuild().
+
+        :param body: Cells of the snake, head first
+        :param dirs: Direction each cell of the body was entered in
+        :param direction: Current direction of the head
+        :param snack: Cell of the snack
+        :param score: Current score
+        :param ticks: Ticks played so far
+        """
+        SnakeEngine.rebuild(self, body, dirs, direction, snack, score, ticks)
+        self.bits = Bitboard(self.board, self.occupied)
+
+    def advance(self, action=None):
+        """
+        Advances the game by one tick, see SnakeEngine.advance(), and updates the bitboard. Only the old tail, the new
+        head and a new tail can change.
+
+        :param action: UP, LEFT, DOWN or RIGHT, or None to keep moving in the current direction
+        :return: The number of snacks eaten during the tick
+        """
+        tail = self.body[-1]
+        reward = SnakeEngine.advance(self, action)
+        occupied = self.occupied
+
+        if tail not in occupied:
+            self.bits.discard(tail)
+
+        if self.body[0] in occupied:  # Not on the tick the snake dies
+            self.bits.add(self.body[0])
+
+        if reward:
+            self.bits.add(self.body[-1])
+
+        return reward
@@ -0,0 +1,105 @@
+# -*- coding: UTF-8 -*-
+"""
+Fixed-timestep clock for the game loop.
+
+Ticks are scheduled at exact multiples of the tick period on a monotonic clock, so the tick rate does not drift with
+how long moving and drawing take. If a frame runs late the missed ticks are caught up, up to a limit, after which the
+backlog is dropped rather than letting the game fast-forward.
+
+The game only draws a frame after ticks have run. That is deliberate: the snake moves a whole cell per tick, so there
+is nothing to interpolate in between, and the frame rate is the tick rate until frames run late and several ticks are
+caught up in one frame. The measured rates show that difference in the profiling overlay and dump.
+"""
+import time
+from collections import deque
+
+
+class FixedStepClock(object):
+    """
+    This class tells the game loop how many ticks are due and sleeps until the next one, measuring the tick and frame
+    rates it actually achieves.
+    """
+
+    def __init__(self, period, maxCatchUp=5, clock=time.perf_counter, sleep=time.sleep, samples=60):
+        """
+        Creates a clock. The first tick is due one period from now.
+
+        :param period: Seconds between ticks (the game's diff / 1000)
+        :param maxCatchUp: Most ticks run in one frame when catching up
+        :param clock: Monotonic clock returning seconds
+        :param sleep: Function that sleeps for a number of seconds
+        :param samples: Number of recent ticks and frames the rates are measured over
+        """
+        self.period = period
+        self.maxCatchUp = maxCatchUp
+        self.clock = clock
+        self.sleep = sleep
+        self.nextTick = clock() + period  # When the next tick is due
+        self.ticks = 0  # Ticks run so far
+        self.dropped = 0  # Ticks skipped because the loop fell too far behind
+        self.tickTimes = deque(maxlen=samples)  # When the recent ticks were run
+        self.frameTimes = deque(maxlen=samples)  # When the recent frames were drawn
+
+    def due(self):
+        """
+        Counts the ticks that are due now and schedules the following ones.
+
+        :return: Number of ticks to run before drawing the next frame (0 to maxCatchUp)
+        """
+        now = self.clock()
+        ticks = 0
+
+        while now >= self.nextTick and ticks < self.maxCatchUp:
+            self.nextTick += self.period  # Exact multiples of the period, so late frames do not shift the schedule
+            self.tickTimes.append(now)
+            ticks += 1
+
+        if now >= self.nextTick:  # Still behind after catching up, the rest of the backlog is dropped
+            missed = int((now - self.nextTick) // self.period) + 1
+            self.dropped += missed
+            self.nextTick += missed * self.period
+
+        self.ticks += ticks
+        return ticks
+
+    def frame(self):
+        """
+        Records that a frame has been drawn.
+        """
+        self.frameTimes.append(self.clock())
+
+    def wait(self):
+        """
+        Sleeps until the next tick is due.
+        """
+        remaining = self.nextTick - self.clock()
+
+        if remaining > 0:
+            self.sleep(remaining)
+
+    @staticmethod
+    def rate(times):
+        """
+        Measures how often something happened.
+
+        :param times: Recent times it happened at, oldest first
+        :return: Times per second, or 0.0 if there are not enough samples
+        """
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    @property
+    def tickRate(self):
+        """
+        :return: Measured ticks per second
+        """
+        return self.rate(self.tickTimes)
+
+    @property
+    def frameRate(self):
+        """
+        :return: Measured frames per second
+        """
+        return self.rate(self.frameTimes)
@@ -0,0 +1,287 @@
+# -*- coding: UTF-8 -*-
+"""
+Game state for search-based bots.
+
+GameState plays by the same rules as SnakeEngine (and so as main()), but every step() pushes a small undo record (the
+old direction, the vacated tail cell, the old snack and generator state, and what happened) and unstep() pops it to
+put the head, the tail and the snack back. Nothing is copied, so a step and its unstep cost the same whatever the
+length of the snake. Snapshots work the same way: snapshot() is O(1), it only notes how deep the undo stack is, and
+restore() unsteps back down to it. A snapshot can be restored as long as the game has not been unstepped past it since,
+which is how lookahead searches (MCTS, beam search with backtracking) walk their tree: try moves from a node, restore
+the node, try others. Use copy() for a fully independent state.
+
+    state = GameState.fromEngine(engine)
+    root = state.snapshot()
+
+    for action in (UP, LEFT, DOWN, RIGHT):
+        reward = state.step(action)
+        ...  # Look further ahead
+        state.restore(root)
+"""
+from collections import deque, namedtuple
+from itertools import count
+
+from snakeEngine import DEFAULT_BOARD, RIGHT, VELOCITIES, GameRng, State
+
+MOVED = 0  # Undo record outcome: the snake moved
+ATE = 1  # Undo record outcome: the snake ate, and grew a new tail
+DIED = 2  # Undo record outcome: the snake hit itself
+
+Snapshot = namedtuple("Snapshot", ["depth", "serial"])
+
+serials = count(1)  # Numbers undo records and empty stacks, shared by every GameState so none are ever reused
+
+
+class GameState(object):
+    """
+    This class is one game of Snake with an undo stack. The body is a deque of cells (head first) with a parallel
+    deque of the direction each cell was entered in, as in SnakeEngine.
+    """
+
+    __slots__ = ("board", "rng", "body", "dirs", "occupied", "free", "direction", "snack", "score", "ticks", "done",
+                 "won", "undo", "serial", "baseSerial")
+
+    def __init__(self, seed=None, board=DEFAULT_BOARD):
+        """
+        Creates a state and starts a game.
+
+        :param seed: Seed for the snack generator (None seeds from the OS)
+        :param board: Board to play on
+        """
+        self.board = board
+        self.rng = GameRng()
+        self.reset(seed)
+
+    @classmethod
+    def fromEngine(cls, engine):
+        """
+        Copies the current game of a SnakeEngine, generator included, so the state plays on exactly like it.
+
+        :param engine: SnakeEngine
+        :return: A new GameState, with an empty undo stack
+        """
+        state = cls.__new__(cls)
+        state.board = engine.board
+        state.rng = GameRng(engine.rng.state)
+        state.load(engine.body, engine.dirs, engine.direction, engine.snack, engine.score, engine.ticks, engine.done,
+                   engine.won)
+
+        return state
+
+    def reset(self, seed=None):
+        """
+        Starts a new game with a snake of size 1, forgetting the undo stack.
+
+        :param seed: Seed for the snack generator (None seeds from the OS)
+        """
+        start = self.board.start
+        self.rng.seed(seed)
+        self.load([start], [RIGHT], RIGHT, None, 0, 0, False, False)
+        self.snack = self.free.choice(self.rng)
+
+    def load(self, body, dirs, direction, snack, score, ticks, done, won):
+        """
+        Sets the whole game, forgetting the undo stack. The generator state is not touched.
+
+        :param body: Cells of the snake, head first
+        :param dirs: Direction each cell of the body was entered in
+        :param direction: Current direction of the head
+        :param snack: Cell of the snack, or None
+        :param score: Current score
+        :param ticks: Ticks played so far
+        :param done: True if the game is over
+        :param won: True if the game ended with a full board
+        """
+        self.body = deque(body)
+        self.dirs = deque(dirs)
+        self.occupied = set(self.body)
+        self.free = self.board.freeCells()
+
+        for cell in self.occupied:
+            self.free.remove(cell)
+
+        self.direction = direction
+        self.snack = snack
+        self.score = score
+        self.ticks = ticks
+        self.done = done
+        self.won = won
+        self.undo = []  # Undo records, the newest last
+        self.serial = next(serials)  # Number of the last undo record made, never reused
+        self.baseSerial = self.serial  # Stands for the state below the first undo record
+
+    def copy(self):
+        """
+        :return: An independent GameState of the same game, with an empty undo stack
+        """
+        state = GameState.__new__(GameState)
+        state.board = self.board
+        state.rng = GameRng(self.rng.state)
+        state.body = deque(self.body)
+        state.dirs = deque(self.dirs)
+        state.occupied = set(self.occupied)
+        state.free = self.free.copy()
+        state.direction = self.direction
+        state.snack = self.snack
+        state.score = self.score
+        state.ticks = self.ticks
+        state.done = self.done
+        state.won = self.won
+        state.undo = []
+        state.serial = next(serials)
+        state.baseSerial = state.serial
+
+        return state
+
+    def state(self):
+        """
+        :return: State tuple describing the current game
+        """
+        return State(self.body[0], self.direction, self.snack, len(self.body), self.score, self.ticks)
+
+    def step(self, action=None):
+        """
+        Advances the game by one tick, like SnakeEngine.advance(), and remembers how to undo it.
+
+        :param action: UP, LEFT, DOWN or RIGHT, or None to keep moving in the current direction
+        :return: The number of snacks eaten during the tick (check self.done to see if the game is over)
+        """
+        if self.done:
+            raise RuntimeError("step() called on a finished game, unstep() or reset() first")
+
+        oldDirection = self.direction
+
+        if action is not None:
+            self.direction = action
+
+        body = self.body
+        dirs = self.dirs
+        occupied = self.occupied
+        free = self.free
+        cols, rows, cellSize = self.board
+        dX, dY = VELOCITIES[self.direction]
+        headX, headY = body[0]
+        x = headX + dX
+        y = headY + dY
+
+        # Same boundaries as Snake.move(), the head reappears on the opposite side of the board
+        if x >= cols:
+            x = 0
+        elif x < 0:
+            x = cols - 1
+        elif y >= rows:
+            y = 0
+        elif y < 0:
+            y = rows - 1
+
+        head = (x, y)
+        tail = body.pop()
+        tailDir = dirs.pop()
+        occupied.discard(tail)
+        free.add(tail)
+        self.ticks += 1
+        self.serial = next(serials)
+        body.appendleft(head)
+        dirs.appendleft(self.direction)
+
+        # Backing into the old tail cell counts as a hit, as does running into any other body part
+        if head == tail or head in occupied:
+            self.done = True
+            self.undo.append((self.serial, oldDirection, tail, tailDir, self.snack, None, DIED))
+            return 0
+
+        occupied.add(head)
+        free.remove(head)
+
+        if head != self.snack:
+            self.undo.append((self.serial, oldDirection, tail, tailDir, self.snack, None, MOVED))
+            return 0
+
+        self.undo.append((self.serial, oldDirection, tail, tailDir, self.snack, self.rng.state, ATE))
+
+        # Snake.addSquare() puts the new tail behind the current one without wrapping it around the window
+        tailX, tailY = body[-1]
+        newTailDir = dirs[-1]
+        dX, dY = VELOCITIES[newTailDir]
+        newTail = (tailX - dX, tailY - dY)
+        body.append(newTail)
+        dirs.append(newTailDir)
+        occupied.add(newTail)
+        free.remove(newTail)
+        self.score += 1
+        self.snack = free.choice(self.rng)
+
+        if self.snack is None:  # The board is full, so the game is won
+            self.done = True
+            self.won = True
+
+        return 1
+
+    def unstep(self):
+        """
+        Undoes the last step().
+        """
+        if not self.undo:
+            raise IndexError("unstep() called with nothing to undo")
+
+        serial, direction, tail, tailDir, snack, rngState, outcome = self.undo.pop()
+        body = self.body
+        dirs = self.dirs
+        occupied = self.occupied
+        free = self.free
+
+        if outcome == ATE:
+            newTail = body.pop()
+            dirs.pop()
+            occupied.discard(newTail)
+            free.add(newTail)
+            self.score -= 1
+            self.rng.state = rngState
+
+        head = body.popleft()
+        dirs.popleft()
+
+        if outcome != DIED:  # A fatal head was never added to the occupied cells
+            occupied.discard(head)
+            free.add(head)
+
+        body.append(tail)
+        dirs.append(tailDir)
+        occupied.add(tail)
+        free.remove(tail)
+        self.direction = direction
+        self.snack = snack
+        self.ticks -= 1
+        self.done = False
+        self.won = False
+
+    def snapshot(self):
+        """
+        :return: Snapshot of the current state, for restore()
+        """
+        depth = len(self.undo)
+        return Snapshot(depth, self.undo[-1][0] if depth else self.baseSerial)
+
+    def restore(self, snapshot):
+        """
+        Unsteps back to a snapshot.
+
+        :param snapshot: Snapshot taken on this state, not unstepped past since (one from another state is refused)
+        """
+        depth = snapshot.depth
+        undo = self.undo
+
+        if depth > len(undo) or (undo[depth - 1][0] if depth else self.baseSerial) != snapshot.serial:
+            raise ValueError("the snapshot is not on the current line of play")
+
+        while len(undo) > depth:
+            self.unstep()
+
+    def forget(self):
+        """
+        Drops the undo stack, e.g. once a move has really been played, so it does not keep growing. Older snapshots
+        can no longer be restored.
+        """
+        self.undo = []
+        self.serial = next(serials)
+        self.baseSerial = self.serial
@@ -0,0 +1,144 @@
+# -*- coding: UTF-8 -*-
+"""
+High score storage.
+
+The scores are read from disk once and served from memory. The file is only rewritten when a score actually changes,
+by writing a temporary file next to it and renaming it over the old one, so a crash never leaves a half-written file.
+A save that fails (read-only or full disk, unreachable network folder) is logged rather than raised, and is tried
+again on the next one, so the game carries on with its scores in memory.
+"""
+import logging
+import os
+import stat
+import tempfile
+
+DIFFS = (125, 100, 75)  # Easy, Normal and Hard, in the order they are stored in the file
+
+log = logging.getLogger(__name__)
+
+
+class HighScoreStore(object):
+    """
+    This class keeps the high score of every difficulty. Scores are looked up by the game's diff value.
+    """
+
+    def __init__(self, path):
+        """
+        Creates the store and loads the scores from the file.
+
+        :param path: Path of the high score file (one score per line: Easy, Normal, Hard)
+        """
+        self.path = path
+        self.scores = [0] * len(DIFFS)
+        self.dirty = False  # True if the scores in memory differ from the file
+        self.load()
+
+    def load(self):
+        """
+        Reads the scores from the file. A missing, truncated or corrupt file is not an error: any score that can not
+        be read counts as 0, and the file is fixed on the next save().
+        """
+        try:
+            with open(self.path) as file:
+                lines = file.read().split()
+        except OSError:
+            lines = []
+
+        for i in range(len(DIFFS)):
+            try:
+                self.scores[i] = max(0, int(lines[i]))
+            except (IndexError, ValueError):
+                self.scores[i] = 0
+
+        self.dirty = False
+
+    def get(self, diff):
+        """
+        :param diff: Difficulty (125, 100 or 75)
+        :return: The high score for that difficulty
+        """
+        return self.scores[DIFFS.index(diff)]
+
+    def submit(self, diff, score):
+        """
+        Records the score of a finished game and saves it if it is a new high score.
+
+        :param diff: Difficulty the game was played on
+        :param score: Score of the game
+        :return: True if the score is a new high score
+        """
+        i = DIFFS.index(diff)
+
+        if score <= self.scores[i]:
+            self.save()  # Retries an earlier save that failed, if any
+            return False
+
+        self.scores[i] = score
+        self.dirty = True
+        self.save()
+        return True
+
+    def reset(self, diff):
+        """
+        Sets the high score of a difficulty back to 0 and saves it.
+
+        :param diff: Difficulty to reset
+        """
+        i = DIFFS.index(diff)
+
+        if self.scores[i] != 0:
+            self.scores[i] = 0
+            self.dirty = True
+            self.save()
+
+    def save(self):
+        """
+        Writes the scores to the file if they have changed, atomically and keeping the file's permissions. If that
+        fails the error is logged and the scores stay dirty, so the next save() tries again.
+
+        :return: True if the file holds the scores in memory
+        """
+        if not self.dirty:
+            return True
+
+        folder = os.path.dirname(os.path.abspath(self.path))
+
+        try:
+            handle, tempPath = tempfile.mkstemp(prefix=".highscores", dir=folder, text=True)
+        except OSError as error:
+            log.warning("Could not save the high scores to %s: %s", self.path, error)
+            return False
+
+        try:
+            with os.fdopen(handle, "w") as file:
+                file.writelines(str(score) + "\n" for score in self.scores)
+                file.flush()
+                os.fsync(file.fileno())
+
+            os.chmod(tempPath, self.fileMode())  # mkstemp() creates the file readable by its owner only
+            os.replace(tempPath, self.path)  # Atomic, readers see either the old file or the new one
+        except BaseException as error:
+            try:
+                os.unlink(tempPath)
+            except OSError:
+                pass
+
+            if not isinstance(error, OSError):
+                raise
+
+            log.warning("Could not save the high scores to %s: %s", self.path, error)
+            return False
+
+        self.dirty = False
+        return True
+
+    def fileMode(self):
+        """
+        :return: Permission bits of the high score file, or those a new file gets under the umask if there is none
+        """
+        try:
+            return stat.S_IMODE(os.stat(self.path).st_mode)
+        except OSError:
+            umask = os.umask(0)  # Reading the umask means setting it, so it is put straight back
+            os.umask(umask)
+            return 0o666 & ~umask
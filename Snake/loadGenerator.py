@@ -0,0 +1,262 @@
+# -*- coding: UTF-8 -*-
+"""
+Load generator for the multiplayer server.
+
+Opens many client connections to a GameServer, each playing games back to back by steering towards the snack, and
+reports how many states arrived, how many games were played and how evenly the states were spaced. Spectators can be
+added too: each watches one live game after another through the spectator feed and checks that the snake it rebuilds
+is as long as the score says. With --local the server runs in the same process, so a whole test runs over loopback:
+    python loadGenerator.py --local --clients 2000 --seconds 20 --diff 100
+    python loadGenerator.py --local --clients 200 --spectators 1000 --seconds 20
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import deque
+
+from profiler import percentile
+from server import CLIENT_MAGIC, HELLO, STATE, WATCH, WATCH_MAGIC, WATCHING, WELCOME, GameServer, decodeState
+from snakeEngine import DEFAULT_BOARD, DOWN, LEFT, RIGHT, UP, Board
+from spectator import SNAPSHOT, SpectatorView, readMessage
+
+OPPOSITE = {UP: DOWN, DOWN: UP, LEFT: RIGHT, RIGHT: LEFT}
+
+
+class LoadStats(object):
+    """
+    This class adds up what the clients of a load test saw.
+    """
+
+    def __init__(self, samples=100000):
+        """
+        Creates empty statistics.
+
+        :param samples: Number of recent gaps between states kept for the percentiles
+        """
+        self.states = 0  # States received
+        self.games = 0  # Games played to the end
+        self.scores = 0  # Total score of those games
+        self.errors = 0  # Connections that failed or were turned away
+        self.gaps = deque(maxlen=samples)  # Seconds between consecutive states of a game
+        self.live = set()  # Ids of the sessions being played, for spectators to pick from
+        self.spectated = 0  # Games watched
+        self.feedMessages = 0  # Spectator messages received
+        self.feedBytes = 0
+        self.snapshots = 0  # Snapshots among them, on joining or after falling behind
+        self.mismatches = 0  # Spectator views whose length did not match their score
+
+
+def steer(state, direction, cols, rows):
+    """
+    Turns towards the snack along the shorter way around the board, without reversing.
+
+    :param state: ServerState just received
+    :param direction: Direction the snake is moving in
+    :param cols: Board columns
+    :param rows: Board rows
+    :return: Direction to move in
+    """
+    if state.snack is None:
+        return direction
+
+    headX, headY = state.head
+    dX = (state.snack[0] - headX + cols // 2) % cols - cols // 2  # Shortest wrapped offset
+    dY = (state.snack[1] - headY + rows // 2) % rows - rows // 2
+
+    for wanted, needed in ((RIGHT, dX > 0), (LEFT, dX < 0), (DOWN, dY > 0), (UP, dY < 0)):
+        if needed and wanted != OPPOSITE[direction]:
+            return wanted
+
+    return direction
+
+
+async def playGame(host, port, diff, stats):
+    """
+    Plays one game on the server.
+
+    :param host: Server address
+    :param port: Server port
+    :param diff: Milliseconds per tick to ask for
+    :param stats: LoadStats to add to
+    """
+    loop = asyncio.get_running_loop()
+    reader, writer = await asyncio.open_connection(host, port)
+    sessionId = None
+
+    try:
+        writer.write(HELLO.pack(CLIENT_MAGIC, diff))
+        magic, version, seed, diff, cols, rows, sessionId = WELCOME.unpack(await reader.readexactly(WELCOME.size))
+        stats.live.add(sessionId)
+        direction = RIGHT
+        last = None
+
+        while True:
+            state = decodeState(await reader.readexactly(STATE.size))
+            now = loop.time()
+            stats.states += 1
+
+            if last is not None:
+                stats.gaps.append(now - last)
+
+            last = now
+
+            if state.done:
+                stats.games += 1
+                stats.scores += state.score
+                return
+
+            turn = steer(state, direction, cols, rows)
+
+            if turn != direction:
+                writer.write(bytes((turn,)))
+                direction = turn
+    finally:
+        stats.live.discard(sessionId)
+        writer.close()
+
+
+async def watchGame(host, port, sessionId, stats):
+    """
+    Watches one game through the spectator feed.
+
+    :param host: Server address
+    :param port: Server port
+    :param sessionId: Session to watch
+    :param stats: LoadStats to add to
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+
+    try:
+        writer.write(WATCH.pack(WATCH_MAGIC, sessionId))
+        magic, version, sessionId, diff, cols, rows = WATCHING.unpack(await reader.readexactly(WATCHING.size))
+        view = SpectatorView(Board(cols, rows))
+        stats.spectated += 1
+
+        while not view.done:
+            message = await readMessage(reader)
+            view.apply(message)
+            stats.feedMessages += 1
+            stats.feedBytes += len(message)
+            stats.snapshots += message[:1] == SNAPSHOT
+
+            if len(view.body) != view.score + 1:
+                stats.mismatches += 1
+    finally:
+        writer.close()
+
+
+async def runSpectator(host, port, stats, deadline):
+    """
+    Watches live games one after another until the deadline.
+
+    :param host: Server address
+    :param port: Server port
+    :param stats: LoadStats to add to
+    :param deadline: Loop time to stop at
+    """
+    while asyncio.get_running_loop().time() < deadline:
+        if not stats.live:
+            await asyncio.sleep(0.1)
+            continue
+
+        try:
+            await watchGame(host, port, random.choice(tuple(stats.live)), stats)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):  # The game ended or its player left
+            await asyncio.sleep(0.1)
+
+
+async def runClient(host, port, diff, stats, deadline):
+    """
+    Plays games back to back until the deadline.
+
+    :param host: Server address
+    :param port: Server port
+    :param diff: Milliseconds per tick to ask for
+    :param stats: LoadStats to add to
+    :param deadline: Loop time to stop at
+    """
+    while asyncio.get_running_loop().time() < deadline:
+        try:
+            await playGame(host, port, diff, stats)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            stats.errors += 1
+            await asyncio.sleep(0.1)
+
+
+async def runLoad(host, port, clients, diff, seconds, local=False, board=DEFAULT_BOARD, spectators=0):
+    """
+    Runs a load test.
+
+    :param host: Server address
+    :param port: Server port (any free port with local)
+    :param clients: Number of concurrent clients
+    :param diff: Milliseconds per tick the clients ask for
+    :param seconds: How long to run for
+    :param local: Starts a GameServer in this process
+    :param board: Board of the local server
+    :param spectators: Number of concurrent spectators
+    :return: dict of results
+    """
+    loop = asyncio.get_running_loop()
+    server = None
+
+    if local:
+        server = GameServer(board, maxSessions=clients)
+        port = await server.start(host, 0 if port is None else port)
+
+    stats = LoadStats()
+    deadline = loop.time() + seconds
+    began = time.perf_counter()
+    tasks = [loop.create_task(runClient(host, port, diff, stats, deadline)) for _ in range(clients)]
+    tasks += [loop.create_task(runSpectator(host, port, stats, deadline)) for _ in range(spectators)]
+    await asyncio.sleep(seconds)
+
+    for task in tasks:
+        task.cancel()
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+    wallSeconds = time.perf_counter() - began
+
+    if server:
+        await server.close()
+
+    gaps = sorted(stats.gaps)
+
+    return {
+        "clients": clients,
+        "diff": diff,
+        "states": stats.states,
+        "statesPerSecond": stats.states / wallSeconds,
+        "expectedPerSecond": clients * 1000 / diff,
+        "games": stats.games,
+        "meanScore": stats.scores / stats.games if stats.games else 0.0,
+        "errors": stats.errors,
+        "gapMs": {name: percentile(gaps, fraction) * 1000
+                  for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))},
+        "spectators": spectators,
+        "spectated": stats.spectated,
+        "feedMessages": stats.feedMessages,
+        "feedBytesPerMessage": stats.feedBytes / stats.feedMessages if stats.feedMessages else 0.0,
+        "snapshots": stats.snapshots,
+        "mismatches": stats.mismatches,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Loads the multiplayer server with many clients.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--spectators", type=int, default=0)
+    parser.add_argument("--diff", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--local", action="store_true", help="runs the server in this process")
+    parser.add_argument("--board", type=Board.parse, default=DEFAULT_BOARD, help="board size of the local server")
+    args = parser.parse_args()
+
+    if args.port is None and not args.local:
+        args.port = 7777
+
+    print(asyncio.run(runLoad(args.host, args.port, args.clients, args.diff, args.seconds, args.local, args.board,
+                              args.spectators)))
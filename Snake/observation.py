@@ -0,0 +1,219 @@
+# -*- coding: UTF-8 -*-
+"""
+Observation buffers for training bots (requires NumPy).
+
+ObservationBuffer describes a game as a few preallocated arrays that are written in place on every tick:
+    grid       (CHANNELS, rows, cols) float32: the HEAD cell, the BODY with its age, and the SNACK cell
+    direction  (4,) float32: one-hot of the head's direction, in UP, LEFT, DOWN, RIGHT order
+    scalars    (len(SCALARS),) float32: the snake's length and the wrapped offset from the head to the snack
+The arrays handed out are read-only views of the buffers, so they change with the game and must be copied by callers
+that want to keep them. With frames > 1, grid is the last frames grids stacked oldest first, a view into a ring that
+keeps every frame twice so the window of recent frames is always contiguous.
+
+A tick only moves the head, the tail and maybe the snack, so the buffer does not walk the body. It keeps the tick each
+cell was last entered by the head: a cell is part of a body of length L if it was entered in the last L ticks, and its
+age follows from the same numbers with a few in-place NumPy operations on the whole grid.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from snakeEngine import DEFAULT_BOARD, DOWN, LEFT, RIGHT, UP
+
+HEAD, BODY, SNACK = range(3)  # Channels of the grid
+CHANNELS = 3
+SCALARS = ("length", "snackX", "snackY")  # Length over the board area, offset to the snack over the board size
+
+
+Observation = namedtuple("Observation", ["grid", "direction", "scalars"])
+
+
+def readOnly(array):
+    """
+    :param array: A NumPy array
+    :return: A view of it that can not be written to
+    """
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class ObservationBuffer(object):
+    """
+    This class holds the observation of one game, updated in place once per tick with observe() (the game's Snake and
+    snack Square) or observeEngine() (a SnakeEngine).
+    """
+
+    def __init__(self, board=DEFAULT_BOARD, frames=1):
+        """
+        Creates the buffers.
+
+        :param board: Board of the games observed
+        :param frames: Number of recent grids stacked in the observation
+        """
+        cols, rows = board.cols, board.rows
+        self.board = board
+        self.frames = frames
+        self.grid = np.zeros((CHANNELS, rows, cols), dtype=np.float32)
+        self.direction = np.zeros(4, dtype=np.float32)
+        self.scalars = np.zeros(len(SCALARS), dtype=np.float32)
+        self.entered = np.zeros((rows, cols), dtype=np.int64)  # Tick each cell was last entered by the head
+        self.left = np.zeros((rows, cols), dtype=np.int64)  # Scratch: ticks before each body cell frees up
+        self.ring = np.zeros((2 * frames, CHANNELS, rows, cols), dtype=np.float32) if frames > 1 else None
+        self.slot = 0  # Ring slot of the newest grid
+        self.tick = 0  # Ticks observed since the last reset
+        self.head = None  # (x, y) of the head on the last tick
+        self.snack = None  # (x, y) of the snack on the last tick
+        self.engineTicks = None  # engine.ticks on the last observeEngine()
+        self.views = Observation(readOnly(self.grid), readOnly(self.direction), readOnly(self.scalars))
+
+    def observe(self, snake, snack, reset=False):
+        """
+        Observes the game's snake after a tick. Call it on every tick, with reset=True on the first one of a game.
+
+        :param snake: snakeGame.Snake
+        :param snack: Snack Square, or None if there is none
+        :param reset: Rebuilds the whole observation from the snake instead of updating it
+        :return: Observation of read-only views
+        """
+        size = snake.size
+        head = snake.head
+        direction = UP if head.dirUp else LEFT if head.dirLeft else DOWN if head.dirDown else RIGHT
+        snackCell = (snack.posX // size, snack.posY // size) if snack else None
+
+        if reset or self.head is None:
+            cells = [(square.posX // size, square.posY // size) for square in snake.body]
+            return self.reset(cells, direction, snackCell)
+
+        tail = snake.body[-1]
+        return self.advance((head.posX // size, head.posY // size), direction, len(snake.body), snackCell,
+                            (tail.posX // size, tail.posY // size))
+
+    def observeEngine(self, engine):
+        """
+        Observes a SnakeEngine. A new game is noticed from its tick count, so it only has to be called once per tick.
+
+        :param engine: SnakeEngine
+        :return: Observation of read-only views
+        """
+        if self.engineTicks is None or engine.ticks != self.engineTicks + 1:
+            self.engineTicks = engine.ticks
+            return self.reset(engine.body, engine.direction, engine.snack)
+
+        self.engineTicks = engine.ticks
+        return self.advance(engine.body[0], engine.direction, len(engine.body), engine.snack, engine.body[-1])
+
+    def reset(self, body, direction, snack):
+        """
+        Rebuilds the observation from a whole snake.
+
+        :param body: (x, y) cells of the snake, head first
+        :param direction: UP, LEFT, DOWN or RIGHT
+        :param snack: (x, y) cell of the snack, or None
+        :return: Observation of read-only views
+        """
+        cols, rows = self.board.cols, self.board.rows
+        self.tick = 0
+        self.entered.fill(-2 * cols * rows)  # Long before any body could reach back
+        self.grid[HEAD].fill(0)
+        self.grid[SNACK].fill(0)
+
+        for i, (x, y) in reversed(list(enumerate(body))):  # Tail first, so cells under two Squares keep the newest
+            if 0 <= x < cols and 0 <= y < rows:
+                self.entered[y, x] = -i  # Square i was the head i ticks ago
+
+        self.head = None
+        self.snack = None
+        self.write(body[0], direction, len(body), snack)
+
+        if self.ring is not None:
+            self.ring[:] = self.grid  # Every stacked frame starts as the first one
+            self.slot = 0
+
+        return self.output()
+
+    def advance(self, head, direction, length, snack, tail=None):
+        """
+        Updates the observation for one tick.
+
+        :param head: (x, y) cell of the new head
+        :param direction: UP, LEFT, DOWN or RIGHT
+        :param length: Number of Squares in the snake
+        :param snack: (x, y) cell of the snack, or None
+        :param tail: (x, y) cell of the tail, if known
+        :return: Observation of read-only views
+        """
+        cols, rows = self.board.cols, self.board.rows
+        self.tick += 1
+        x, y = head
+        self.entered[y, x] = self.tick
+
+        if tail is not None:
+            tailX, tailY = tail
+
+            if not (0 <= tailX < cols and 0 <= tailY < rows):
+                # A tail placed outside the board by addSquare(): the cell it wraps to was vacated, not kept
+                wrapped = (tailX % cols, tailY % rows)
+
+                if wrapped != head:
+                    self.entered[wrapped[1], wrapped[0]] -= length
+
+        self.write(head, direction, length, snack)
+
+        if self.ring is not None:
+            self.slot = (self.slot + 1) % self.frames
+            self.ring[self.slot] = self.grid
+            self.ring[self.slot + self.frames] = self.grid
+
+        return self.output()
+
+    def write(self, head, direction, length, snack):
+        """
+        Writes the current grid, direction and scalars.
+
+        :param head: (x, y) cell of the head
+        :param direction: UP, LEFT, DOWN or RIGHT
+        :param length: Number of Squares in the snake
+        :param snack: (x, y) cell of the snack, or None
+        """
+        cols, rows = self.board.cols, self.board.rows
+        grid = self.grid
+
+        # Ticks before each cell frees up, over the length: 1 at the head down to 1 / length at the tail, 0 elsewhere
+        np.subtract(self.entered, self.tick - length, out=self.left)
+        np.maximum(self.left, 0, out=self.left)
+        np.multiply(self.left, 1.0 / length, out=grid[BODY], casting="unsafe")
+
+        if self.head is not None:
+            grid[HEAD, self.head[1], self.head[0]] = 0
+
+        grid[HEAD, head[1], head[0]] = 1
+        self.head = head
+
+        if self.snack is not None:
+            grid[SNACK, self.snack[1], self.snack[0]] = 0
+
+        if snack is not None:
+            grid[SNACK, snack[1], snack[0]] = 1
+            # Shortest wrapped offset, from -0.5 to 0.5 of the board
+            self.scalars[1] = ((snack[0] - head[0] + cols // 2) % cols - cols // 2) / cols
+            self.scalars[2] = ((snack[1] - head[1] + rows // 2) % rows - rows // 2) / rows
+        else:
+            self.scalars[1:] = 0
+
+        self.snack = snack
+        self.scalars[0] = length / (cols * rows)
+        self.direction.fill(0)
+        self.direction[direction] = 1
+
+    def output(self):
+        """
+        :return: Observation of read-only views, with the stacked grids if frames > 1
+        """
+        if self.ring is None:
+            return self.views
+
+        stacked = self.ring[self.slot + 1:self.slot + 1 + self.frames]  # Oldest first
+        stacked.flags.writeable = False
+
+        return Observation(stacked, self.views.direction, self.views.scalars)
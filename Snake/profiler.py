@@ -0,0 +1,168 @@
+# -*- coding: UTF-8 -*-
+"""
+Per-phase profiling of the game loop.
+
+main() times each phase of a frame (reading input, moving the snake, checking collisions, handling the snack and
+drawing) with a monotonic clock. The last few hundred frames are kept to report rolling p50/p95/p99 times per phase,
+and the slowest frame of the game is kept whole, so an occasional hitch can be traced to the phase that caused it.
+When profiling is off the game uses a NullProfiler, whose methods do nothing.
+"""
+import csv
+import json
+import time
+from collections import deque
+
+PHASES = ("input", "move", "collision", "snack", "draw")  # In the order they run in a frame
+COLUMNS = ("frame", "ticks") + PHASES + ("total",)  # One row per frame, times in milliseconds
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile.
+
+    :param values: Sorted list of values
+    :param fraction: Percentile as a fraction, e.g. 0.95
+    :return: The value, or 0.0 if there are no values
+    """
+    if not values:
+        return 0.0
+
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class TickProfiler(object):
+    """
+    This class times the phases of every frame and keeps the recent frames as rows of COLUMNS.
+    """
+
+    enabled = True
+
+    def __init__(self, samples=600, clock=time.perf_counter):
+        """
+        Creates a profiler.
+
+        :param samples: Number of recent frames the percentiles are measured over
+        :param clock: Monotonic clock returning seconds
+        """
+        self.clock = clock
+        self.history = deque(maxlen=samples)  # Rows of the recent frames
+        self.worst = None  # Row of the slowest frame so far
+        self.frames = 0  # Frames recorded so far
+        self.current = dict.fromkeys(PHASES, 0.0)  # Seconds spent in each phase during the current frame
+
+    def start(self):
+        """
+        :return: The time now, to pass to the first lap() of a frame
+        """
+        return self.clock()
+
+    def lap(self, phase, started):
+        """
+        Charges the time since started to a phase. A phase can run more than once in a frame (one move per tick),
+        its times are added up.
+
+        :param phase: One of PHASES
+        :param started: When the phase started, as returned by start() or the previous lap()
+        :return: The time now, when the next phase starts
+        """
+        now = self.clock()
+        self.current[phase] += now - started
+        return now
+
+    def endFrame(self, ticks):
+        """
+        Records the current frame and starts a new one.
+
+        :param ticks: Number of ticks run in the frame
+        """
+        current = self.current
+        times = [current[phase] * 1000 for phase in PHASES]
+        row = (self.frames, ticks) + tuple(times) + (sum(times),)
+        self.history.append(row)
+
+        if self.worst is None or row[-1] > self.worst[-1]:
+            self.worst = row
+
+        self.frames += 1
+        self.current = dict.fromkeys(PHASES, 0.0)
+
+    def summary(self):
+        """
+        :return: dict mapping each phase and "total" to its p50, p95, p99 and max over the recent frames, in ms
+        """
+        summary = {}
+
+        for column in range(2, len(COLUMNS)):
+            values = sorted(row[column] for row in self.history)
+            summary[COLUMNS[column]] = {
+                "p50": percentile(values, 0.50),
+                "p95": percentile(values, 0.95),
+                "p99": percentile(values, 0.99),
+                "max": values[-1] if values else 0.0,
+            }
+
+        return summary
+
+    def dump(self, path, rates=None):
+        """
+        Writes the recent frames to a file: as CSV rows if the path ends in .csv, otherwise as JSON along with the
+        summary, the slowest frame and the measured rates.
+
+        :param path: Path of the file
+        :param rates: dict of measured rates to include in the JSON (see clockRates()), if any
+        """
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(COLUMNS)
+                writer.writerows(self.history)
+            return
+
+        with open(path, "w") as file:
+            json.dump({
+                "frames": self.frames,
+                "summary": self.summary(),
+                "worst": dict(zip(COLUMNS, self.worst)) if self.worst else None,
+                "rates": rates,
+                "columns": COLUMNS,
+                "history": list(self.history),
+            }, file, indent=2)
+
+
+def clockRates(clock):
+    """
+    :param clock: gameClock.FixedStepClock of the game
+    :return: dict of its measured ticks and frames per second, and the ticks it dropped
+    """
+    return {"ticksPerSecond": clock.tickRate, "framesPerSecond": clock.frameRate, "droppedTicks": clock.dropped}
+
+
+class NullProfiler(object):
+    """
+    Stands in for a TickProfiler when profiling is off, so the game loop does not have to check.
+    """
+
+    enabled = False
+
+    def start(self):
+        """
+        :return: 0.0, nothing is timed
+        """
+        return 0.0
+
+    def lap(self, phase, started):
+        """
+        Does nothing.
+
+        :param phase: One of PHASES
+        :param started: Ignored
+        :return: 0.0
+        """
+        return 0.0
+
+    def endFrame(self, ticks):
+        """
+        Does nothing.
+
+        :param ticks: Ignored
+        """
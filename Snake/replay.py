@@ -0,0 +1,346 @@
+# -*- coding: UTF-8 -*-
+"""
+Compact binary replays.
+
+A replay holds the seed and difficulty of a game plus the direction the snake moved in on every tick; everything else
+is re-simulated with SnakeEngine. Directions take 2 bits: they are either packed 4 to a byte or run-length encoded as
+one byte per run (2 bits of direction, 6 bits of run length), whichever is smaller. Every keyframeInterval ticks a
+keyframe of the whole game state is stored as well, so seek() only has to simulate from the nearest keyframe.
+
+File layout (big-endian):
+    header      magic "SNKR", version, diff, board columns and rows, seed, ticks, keyframe interval, input encoding,
+                input size, keyframe count (version 1 has no board size, those games were played on the 30 x 30 board)
+    inputs      the encoded directions
+    keyframes   tick, score, direction, flags, generator state, snack, head, length, then the body's directions packed
+                4 to a byte (each body cell is the one before it stepped back against its direction)
+"""
+import struct
+
+from snakeEngine import DEFAULT_BOARD, Board, SnakeEngine, VELOCITIES
+
+MAGIC = b"SNKR"
+VERSION = 2
+HEADER = struct.Struct(">4sBHHHQIIBII")
+HEADER_V1 = struct.Struct(">4sBHQIIBII")  # Replays written before the board size was configurable
+KEYFRAME = struct.Struct(">IIBBQHHHHI")
+RAW = 0  # Directions packed 4 to a byte
+RLE = 1  # One byte per run of the same direction
+MAX_RUN = 64  # Longest run one RLE byte can hold
+TAIL_OUTSIDE = 1  # Keyframe flag: the tail was just added outside the window by addSquare()
+
+
+def packDirections(directions):
+    """
+    Packs directions 4 to a byte, first direction in the lowest bits.
+
+    :param directions: Sequence of directions (0 to 3)
+    :return: The packed bytes
+    """
+    packed = bytearray((len(directions) + 3) // 4)
+
+    for i, direction in enumerate(directions):
+        packed[i >> 2] |= direction << ((i & 3) << 1)
+
+    return bytes(packed)
+
+
+def unpackDirections(packed, count):
+    """
+    Reverses packDirections().
+
+    :param packed: The packed bytes
+    :param count: Number of directions packed
+    :return: bytearray with one direction per byte
+    """
+    directions = bytearray(count)
+
+    for i in range(count):
+        directions[i] = packed[i >> 2] >> ((i & 3) << 1) & 3
+
+    return directions
+
+
+def encodeRuns(directions):
+    """
+    Run-length encodes directions, one byte per run of up to MAX_RUN ticks.
+
+    :param directions: Sequence of directions (0 to 3)
+    :return: The encoded bytes
+    """
+    encoded = bytearray()
+    i = 0
+    count = len(directions)
+
+    while i < count:
+        direction = directions[i]
+        run = 1
+
+        while i + run < count and run < MAX_RUN and directions[i + run] == direction:
+            run += 1
+
+        encoded.append(direction << 6 | (run - 1))
+        i += run
+
+    return bytes(encoded)
+
+
+def decodeRuns(encoded):
+    """
+    Reverses encodeRuns().
+
+    :param encoded: The encoded bytes
+    :return: bytearray with one direction per byte
+    """
+    directions = bytearray()
+
+    for byte in encoded:
+        directions += bytes((byte >> 6,)) * ((byte & 63) + 1)
+
+    return directions
+
+
+class Replay(object):
+    """
+    This class is the replay of one game: its seed, its difficulty, its board and one direction per tick. Keyframes
+    are generated when the replay is encoded and kept as (tick, bytes) pairs once it is decoded.
+    """
+
+    def __init__(self, seed, diff, directions=b"", keyframeInterval=500, board=DEFAULT_BOARD):
+        """
+        Creates a replay.
+
+        :param seed: Seed the game's generator was started with
+        :param diff: Difficulty of the game (ms per tick)
+        :param directions: Direction of every tick played so far
+        :param keyframeInterval: Ticks between keyframes
+        :param board: Board the game was played on (only its size is stored, not its cell size)
+        """
+        self.seed = seed
+        self.diff = diff
+        self.board = board
+        self.directions = bytearray(directions)
+        self.keyframeInterval = keyframeInterval
+        self.keyframes = []  # (tick, encoded keyframe), in tick order
+
+    def __len__(self):
+        """
+        :return: The number of ticks in the replay
+        """
+        return len(self.directions)
+
+    def append(self, direction):
+        """
+        Records one tick.
+
+        :param direction: UP, LEFT, DOWN or RIGHT, the direction the snake moved in during the tick
+        """
+        self.directions.append(direction)
+
+    def encode(self):
+        """
+        Encodes the replay, simulating the game to build its keyframes.
+
+        :return: The replay as bytes
+        """
+        self.keyframes = []
+        engine = SnakeEngine(self.seed, self.board)
+
+        for tick, direction in enumerate(self.directions):
+            if tick and tick % self.keyframeInterval == 0 and not engine.done:
+                self.keyframes.append((tick, self.encodeKeyframe(engine)))
+
+            if engine.done:
+                raise ValueError("replay has ticks after the end of the game (tick " + str(tick) + ")")
+
+            engine.advance(direction)
+
+        runs = encodeRuns(self.directions)
+        packed = packDirections(self.directions)
+        encoding, inputs = (RLE, runs) if len(runs) < len(packed) else (RAW, packed)
+        header = HEADER.pack(MAGIC, VERSION, self.diff, self.board.cols, self.board.rows, self.seed,
+                             len(self.directions), self.keyframeInterval, encoding, len(inputs), len(self.keyframes))
+
+        return header + inputs + b"".join(keyframe for tick, keyframe in self.keyframes)
+
+    @classmethod
+    def decode(cls, data):
+        """
+        Reads a replay encoded by encode().
+
+        :param data: The replay as bytes
+        :return: The Replay
+        """
+        magic, version = struct.unpack_from(">4sB", data)
+
+        if magic != MAGIC or not 1 <= version <= VERSION:
+            raise ValueError("not a Snake replay, or one from a newer version of the game")
+
+        if version == 1:
+            magic, version, diff, seed, ticks, interval, encoding, size, keyframes = HEADER_V1.unpack_from(data)
+            board = DEFAULT_BOARD
+            offset = HEADER_V1.size
+        else:
+            header = HEADER.unpack_from(data)
+            magic, version, diff, cols, rows, seed, ticks, interval, encoding, size, keyframes = header
+            board = Board(cols, rows)
+            offset = HEADER.size
+
+        inputs = data[offset:offset + size]
+        offset += size
+        directions = decodeRuns(inputs) if encoding == RLE else unpackDirections(inputs, ticks)
+
+        if len(directions) != ticks:
+            raise ValueError("replay inputs are truncated")
+
+        replay = cls(seed, diff, directions, interval, board)
+
+        for i in range(keyframes):
+            tick, _, _, _, _, _, _, _, _, length = KEYFRAME.unpack_from(data, offset)
+            end = offset + KEYFRAME.size + (length + 3) // 4
+            replay.keyframes.append((tick, bytes(data[offset:end])))
+            offset = end
+
+        return replay
+
+    def save(self, path):
+        """
+        Writes the replay to a file.
+
+        :param path: Path of the file
+        """
+        with open(path, "wb") as file:
+            file.write(self.encode())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a replay from a file.
+
+        :param path: Path of the file
+        :return: The Replay
+        """
+        with open(path, "rb") as file:
+            return cls.decode(file.read())
+
+    @staticmethod
+    def encodeKeyframe(engine):
+        """
+        Encodes the state of a game in progress.
+
+        :param engine: SnakeEngine to encode
+        :return: The keyframe as bytes
+        """
+        tailX, tailY = engine.body[-1]
+        flags = TAIL_OUTSIDE if not (0 <= tailX < engine.board.cols and 0 <= tailY < engine.board.rows) else 0
+        headX, headY = engine.body[0]
+        snackX, snackY = engine.snack
+
+        return KEYFRAME.pack(engine.ticks, engine.score, engine.direction, flags, engine.rng.state, snackX, snackY,
+                             headX, headY, len(engine.body)) + packDirections(engine.dirs)
+
+    @staticmethod
+    def decodeKeyframe(keyframe, engine):
+        """
+        Puts an engine in the state stored in a keyframe.
+
+        :param keyframe: The keyframe as bytes
+        :param engine: SnakeEngine to restore into
+        """
+        ticks, score, direction, flags, state, snackX, snackY, x, y, length = KEYFRAME.unpack_from(keyframe)
+        cols, rows, cellSize = engine.board
+        dirs = unpackDirections(keyframe[KEYFRAME.size:], length)
+        body = [(x, y)]
+
+        for i in range(length - 1):  # Steps back from each cell against the direction it was entered in
+            dX, dY = VELOCITIES[dirs[i]]
+            x -= dX
+            y -= dY
+
+            if not (flags & TAIL_OUTSIDE and i == length - 2):  # A tail added outside the window is not wrapped
+                x %= cols
+                y %= rows
+
+            body.append((x, y))
+
+        engine.rebuild(body, dirs, direction, (snackX, snackY), score, ticks)
+        engine.rng.state = state
+
+    def seek(self, tick, engine=None):
+        """
+        Simulates the game up to a tick, starting from the nearest keyframe before it.
+
+        :param tick: Number of ticks to have played (0 to len(self))
+        :param engine: SnakeEngine to use, a new one is made if None or if it plays on another board
+        :return: The SnakeEngine, after tick ticks
+        """
+        if not 0 <= tick <= len(self.directions):
+            raise IndexError("tick " + str(tick) + " is outside the replay")
+
+        if engine is None or engine.board[:2] != self.board[:2]:
+            engine = SnakeEngine(self.seed, self.board)
+        else:
+            engine.reset(self.seed)
+
+        for keyframeTick, keyframe in reversed(self.keyframes):
+            if keyframeTick <= tick:
+                self.decodeKeyframe(keyframe, engine)
+                break
+
+        directions = self.directions
+        advance = engine.advance
+
+        for i in range(engine.ticks, tick):
+            advance(directions[i])
+
+        return engine
+
+    def play(self):
+        """
+        Simulates the whole game at full speed.
+
+        :return: The SnakeEngine at the end of the game
+        """
+        return self.seek(len(self.directions))
+
+    def playback(self, window, speed=1.0, cellSize=None):
+        """
+        Shows the game in a window through the game's DirtyRenderer, at any speed. Boards larger than the window
+        scroll to follow the snake.
+
+        :param window: Window to draw on
+        :param speed: 1.0 plays at the game's own tick rate, 2.0 twice as fast, and so on
+        :param cellSize: Width and height of a cell in pixels, the board's own if None
+        """
+        import pygame
+        from gameClock import FixedStepClock
+        from snakeGame import DirtyRenderer, Snake, Square
+
+        board = self.board if cellSize is None else self.board._replace(cellSize=cellSize)
+        size = board.cellSize
+        engine = SnakeEngine(self.seed, board)
+        snake = Snake(board)
+        renderer = DirtyRenderer(window, board)
+        clock = FixedStepClock(self.diff / 1000 / speed)
+        tick = 0
+
+        while tick < len(self.directions):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return
+
+            ticks = min(clock.due(), len(self.directions) - tick)
+
+            if ticks:
+                for _ in range(ticks):
+                    engine.advance(self.directions[tick])
+                    tick += 1
+
+                # The frame is drawn from the engine's cells, the Snake only has to answer the renderer's lookups
+                snake.body = [Square(x * size, y * size, (255, 255, 255), size) for x, y in engine.body]
+                snake.head = snake.body[0]
+                snake.occupied = {(x * size, y * size): 1 for x, y in engine.body}
+                snackX, snackY = engine.snack or engine.body[0]  # There is no snack left after a win
+                renderer.full(snake, Square(snackX * size, snackY * size, (111, 201, 129), size), engine.score)
+                clock.frame()
+
+            clock.wait()
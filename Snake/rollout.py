@@ -0,0 +1,192 @@
+# -*- coding: UTF-8 -*-
+"""
+Rollout runner for bot policies.
+
+Episodes are played on the headless SnakeEngine and spread over a process pool. Episode i always uses the seed
+episodeSeed(baseSeed, i), whichever worker runs it, so results only depend on the policy, the base seed and the
+episode count.
+
+Run it as a script to evaluate the built-in greedy policy, or the autopilot:
+    python rollout.py --episodes 100000 --difficulty normal --seed 0
+    python rollout.py --episodes 100 --policy autopilot --max-ticks 1000000
+"""
+import argparse
+import os
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from autopilot import Autopilot
+from snakeEngine import DEFAULT_BOARD, Board, SnakeEngine, VELOCITIES
+
+DIFFICULTIES = {"easy": 125, "normal": 100, "hard": 75}  # The diff values (ms per tick) used by mainMenu()
+
+
+def episodeSeed(baseSeed, episode):
+    """
+    Seed for one episode of a rollout.
+
+    :param baseSeed: Base seed of the rollout
+    :param episode: Index of the episode
+    :return: An int seed, unique for every (baseSeed, episode) pair
+    """
+    return baseSeed * 2 ** 32 + episode
+
+
+def greedyPolicy(engine):
+    """
+    Example policy: heads for the snack by the shortest wrapped distance, avoiding cells that would end the game.
+
+    :param engine: SnakeEngine being played
+    :return: The direction to move in, or None to keep going straight
+    """
+    headX, headY = engine.body[0]
+    snackX, snackY = engine.snack
+    cols, rows, cellSize = engine.board
+    best = None
+    bestDist = None
+
+    for direction, (dX, dY) in enumerate(VELOCITIES):
+        cell = ((headX + dX) % cols, (headY + dY) % rows)
+
+        if cell in engine.occupied:  # Would hit the body, the tail's cell included
+            continue
+
+        distX = abs(cell[0] - snackX)
+        distY = abs(cell[1] - snackY)
+        dist = min(distX, cols - distX) + min(distY, rows - distY)
+
+        if bestDist is None or dist < bestDist:
+            best = direction
+            bestDist = dist
+
+    return best
+
+
+def playEpisodes(policy, baseSeed, start, stop, maxTicks, board=DEFAULT_BOARD):
+    """
+    Plays a range of episodes in the current process.
+
+    :param policy: Callable taking the SnakeEngine and returning an action for SnakeEngine.step()
+    :param baseSeed: Base seed of the rollout
+    :param start: First episode index to play
+    :param stop: Episode index to stop before
+    :param maxTicks: Ticks after which an episode is cut off
+    :param board: Board to play on
+    :return: (scores, lengths, ticks, seconds) for the played episodes
+    """
+    engine = SnakeEngine(board=board)
+    scores = []
+    lengths = []
+    ticks = 0
+    began = time.perf_counter()
+
+    for episode in range(start, stop):
+        engine.reset(episodeSeed(baseSeed, episode))
+        done = False
+
+        while not done and engine.ticks < maxTicks:
+            _, _, done = engine.step(policy(engine))
+
+        scores.append(engine.score)
+        lengths.append(engine.ticks)
+        ticks += engine.ticks
+
+    return scores, lengths, ticks, time.perf_counter() - began
+
+
+def summarize(values):
+    """
+    Summarizes a distribution of episode results.
+
+    :param values: List of numbers, one per episode
+    :return: dict with the mean, min, max and percentiles
+    """
+    if len(values) < 2:
+        percentiles = [values[0]] * 99 if values else [0] * 99
+    else:
+        percentiles = statistics.quantiles(values, n=100, method="inclusive")
+
+    return {
+        "mean": statistics.fmean(values) if values else 0.0,
+        "min": min(values, default=0),
+        "max": max(values, default=0),
+        "p50": percentiles[49],
+        "p95": percentiles[94],
+        "p99": percentiles[98],
+    }
+
+
+def runRollouts(policy, diff=100, episodes=1000, baseSeed=0, workers=None, maxTicks=100000, chunkSize=None,
+                board=DEFAULT_BOARD):
+    """
+    Evaluates a policy over many episodes on a process pool.
+
+    :param policy: Picklable callable (e.g. a module-level function) taking the SnakeEngine and returning an action
+    :param diff: Difficulty, one of the DIFFICULTIES values; used to convert ticks into game time
+    :param episodes: Number of episodes to play
+    :param baseSeed: Base seed of the rollout, see episodeSeed()
+    :param workers: Number of worker processes (defaults to the number of cores)
+    :param maxTicks: Ticks after which an episode is cut off
+    :param chunkSize: Episodes handed to a worker at once (defaults to an even split into 4 chunks per worker)
+    :param board: Board to play on
+    :return: dict with score and length distributions and throughput
+    """
+    if diff not in DIFFICULTIES.values():
+        raise ValueError("diff must be one of " + str(sorted(DIFFICULTIES.values())))
+
+    workers = workers or os.cpu_count() or 1
+    chunkSize = chunkSize or max(1, -(-episodes // (workers * 4)))
+    chunks = [(start, min(start + chunkSize, episodes)) for start in range(0, episodes, chunkSize)]
+    scores = []
+    lengths = []
+    ticks = 0
+    cpuSeconds = 0.0
+    began = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(playEpisodes, policy, baseSeed, start, stop, maxTicks, board) for start, stop in chunks]
+
+        for future in futures:  # Collected in submission order, so the lists follow the episode order
+            chunkScores, chunkLengths, chunkTicks, chunkSeconds = future.result()
+            scores.extend(chunkScores)
+            lengths.extend(chunkLengths)
+            ticks += chunkTicks
+            cpuSeconds += chunkSeconds
+
+    wallSeconds = time.perf_counter() - began
+
+    return {
+        "episodes": episodes,
+        "diff": diff,
+        "baseSeed": baseSeed,
+        "workers": workers,
+        "board": "%dx%d" % board[:2],
+        "scores": summarize(scores),
+        "scoreCounts": dict(sorted(Counter(scores).items())),
+        "lengths": summarize(lengths),
+        "gameSeconds": summarize([length * diff / 1000 for length in lengths]),
+        "ticks": ticks,
+        "wallSeconds": wallSeconds,
+        "ticksPerSecond": ticks / wallSeconds if wallSeconds else 0.0,
+        "ticksPerWorkerSecond": ticks / cpuSeconds if cpuSeconds else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluates a policy over many headless games.")
+    parser.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--difficulty", choices=sorted(DIFFICULTIES), default="normal")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--board", type=Board.parse, default=DEFAULT_BOARD, help="board size, e.g. 1000x1000")
+    parser.add_argument("--policy", choices=("greedy", "autopilot"), default="greedy")
+    parser.add_argument("--max-ticks", type=int, default=100000)
+    args = parser.parse_args()
+
+    policy = Autopilot() if args.policy == "autopilot" else greedyPolicy
+    result = runRollouts(policy, DIFFICULTIES[args.difficulty], args.episodes, args.seed, args.workers,
+                         args.max_ticks, board=args.board)
+    result.pop("scoreCounts")
+    print(result)
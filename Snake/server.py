@@ -0,0 +1,388 @@
+# -*- coding: UTF-8 -*-
+"""
+Multiplayer game server.
+
+Every connection plays its own game, simulated by a SnakeEngine with the same rules as main(), and can be watched
+by spectators through the delta feed of spectator.py. All the sessions run
+on one asyncio event loop: sessions with the same diff share one task, which ticks them all on a FixedStepClock driven
+by the loop's clock. A session holds its engine, the last direction received and nothing else. Direction bytes are
+read in small chunks and states are never queued. If a client reads too slowly to keep its socket buffer under
+sendLimit, the states it can not take are dropped, since the next one supersedes them. Spectators that fall behind
+are dropped to a fresh snapshot by the session's Broadcaster. A session whose tick fails is logged and closed, and the
+rest of its group plays on.
+
+Protocol over TCP (big-endian):
+    client -> server   HELLO: magic "SNKC", diff (milliseconds per tick), then one byte per direction change (0 to 3,
+                       UP, LEFT, DOWN, RIGHT), the last one received before a tick is the one played
+    server -> client   WELCOME: magic "SNKS", version, seed, diff, board columns and rows, session id, then a STATE
+                       per tick: ticks, score, length, head x and y, snack x and y (NO_SNACK once the board is full),
+                       flags (DONE, WON)
+    spectator -> server   WATCH: magic "SNKW", session id
+    server -> spectator   WATCHING: magic "SNKS", version, session id, diff, board columns and rows, then the SNAPSHOT
+                          and DELTA messages of spectator.py
+The server closes the connections of a session, spectators included, after the STATE that ends the game; clients
+reconnect to play again.
+
+Run it from the Snake folder, and load it with loadGenerator.py:
+    python server.py --port 7777
+"""
+import argparse
+import asyncio
+import logging
+import random
+import struct
+from collections import namedtuple
+
+from gameClock import FixedStepClock
+from snakeEngine import DEFAULT_BOARD, Board, SnakeEngine
+from spectator import Broadcaster, StreamSubscriber
+
+CLIENT_MAGIC = b"SNKC"
+SERVER_MAGIC = b"SNKS"
+WATCH_MAGIC = b"SNKW"
+VERSION = 3
+HELLO = struct.Struct(">4sH")
+WELCOME = struct.Struct(">4sBQHHHI")
+WATCH = struct.Struct(">4sI")
+WATCHING = struct.Struct(">4sBIHHH")
+STATE = struct.Struct(">IIIHHHHB")
+NO_SNACK = 0xFFFF
+DONE = 1  # STATE flag: the game is over
+WON = 2  # STATE flag: the game ended with a full board
+MIN_DIFF = 10  # Fastest tick a client can ask for, in milliseconds
+MAX_DIFF = 1000  # Slowest tick a client can ask for, in milliseconds
+
+log = logging.getLogger(__name__)
+
+ServerState = namedtuple("ServerState", ["ticks", "score", "length", "head", "snack", "done", "won"])
+
+
+def encodeState(engine):
+    """
+    :param engine: SnakeEngine of a session
+    :return: STATE message for its current state
+    """
+    headX, headY = engine.body[0]
+    snackX, snackY = engine.snack if engine.snack else (NO_SNACK, NO_SNACK)
+    flags = (DONE if engine.done else 0) | (WON if engine.won else 0)
+
+    return STATE.pack(engine.ticks, engine.score, len(engine.body), headX, headY, snackX, snackY, flags)
+
+
+def decodeState(data):
+    """
+    Reverses encodeState().
+
+    :param data: STATE message
+    :return: ServerState, whose snack is None once the board is full
+    """
+    ticks, score, length, headX, headY, snackX, snackY, flags = STATE.unpack(data)
+    snack = None if snackX == NO_SNACK else (snackX, snackY)
+
+    return ServerState(ticks, score, length, (headX, headY), snack, bool(flags & DONE), bool(flags & WON))
+
+
+class Session(object):
+    """
+    This class is one player's game on the server.
+    """
+
+    def __init__(self, sessionId, diff, board, writer, seed=None):
+        """
+        Starts a game.
+
+        :param sessionId: Number spectators use to watch the session
+        :param diff: Milliseconds per tick
+        :param board: Board to play on
+        :param writer: asyncio StreamWriter of the player's connection
+        :param seed: Seed of the game, a random one if None
+        """
+        self.id = sessionId
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.diff = diff
+        self.engine = SnakeEngine(self.seed, board)
+        self.writer = writer
+        self.broadcaster = Broadcaster()  # Spectator feed
+        self.broadcaster.start(self.engine)
+        self.direction = None  # Last direction received since the previous tick, None keeps the current one
+        self.dropped = 0  # States not sent because the client was not reading
+
+    def welcome(self):
+        """
+        :return: WELCOME message for the session
+        """
+        cols, rows, cellSize = self.engine.board
+        return WELCOME.pack(SERVER_MAGIC, VERSION, self.seed, self.diff, cols, rows, self.id)
+
+    def watching(self):
+        """
+        :return: WATCHING message for the session's spectators
+        """
+        cols, rows, cellSize = self.engine.board
+        return WATCHING.pack(SERVER_MAGIC, VERSION, self.id, self.diff, cols, rows)
+
+    def tick(self, sendLimit):
+        """
+        Plays one tick and sends the new state to the player and the spectators.
+
+        :param sendLimit: Bytes that can wait in the socket buffer before states are dropped
+        """
+        ate = self.engine.advance(self.direction) > 0
+        self.direction = None
+        self.send(encodeState(self.engine), sendLimit)
+        self.broadcaster.publish(self.engine, ate)
+
+    def close(self):
+        """
+        Closes the player's and the spectators' connections.
+        """
+        self.writer.close()
+
+        for subscriber in self.broadcaster.subscribers:
+            subscriber.writer.close()
+
+    def send(self, message, sendLimit):
+        """
+        Sends a message unless the client has fallen behind.
+
+        :param message: Bytes to send
+        :param sendLimit: Bytes that can wait in the socket buffer before messages are dropped
+        """
+        transport = self.writer.transport
+
+        if transport.is_closing():
+            return
+
+        if transport.get_write_buffer_size() > sendLimit:
+            self.dropped += 1
+            return
+
+        self.writer.write(message)
+
+
+class GameServer(object):
+    """
+    This class accepts players and runs their sessions, one ticking task per diff.
+    """
+
+    def __init__(self, board=DEFAULT_BOARD, maxSessions=10000, sendLimit=4096, spectatorLimit=16 * 1024):
+        """
+        Creates a server.
+
+        :param board: Board every session plays on
+        :param maxSessions: Connections beyond this many are turned away
+        :param sendLimit: Bytes that can wait in a client's socket buffer before its states are dropped
+        :param spectatorLimit: Bytes that can wait in a spectator's socket buffer before it is dropped to a snapshot
+        """
+        self.board = board
+        self.maxSessions = maxSessions
+        self.sendLimit = sendLimit
+        self.spectatorLimit = spectatorLimit
+        self.sessions = {}  # Session id -> Session, for spectators
+        self.nextId = 1
+        self.spectatorCount = 0
+        self.groups = {}  # diff -> set of the Sessions ticking at that rate
+        self.tickers = {}  # diff -> task ticking that group
+        self.sessionCount = 0
+        self.gamesPlayed = 0
+        self.ticks = 0  # Session ticks played so far
+        self.server = None
+        self.connections = {}  # Task handling each open connection -> its StreamWriter
+
+    async def start(self, host="127.0.0.1", port=7777):
+        """
+        Starts listening.
+
+        :param host: Address to listen on
+        :param port: Port to listen on, 0 picks a free one
+        :return: The port listened on
+        """
+        self.server = await asyncio.start_server(self.handle, host, port, limit=256)  # Small read buffers
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """
+        Stops listening, closes every connection and waits for them to finish.
+        """
+        if self.server:
+            self.server.close()
+
+        for writer in self.connections.values():
+            writer.close()
+
+        await asyncio.gather(*self.connections, return_exceptions=True)
+
+        if self.server:
+            await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        """
+        Runs one connection: reads the HELLO, then the direction changes until the client disconnects. A WATCH
+        instead makes the connection a spectator of that session.
+
+        :param reader: asyncio StreamReader of the connection
+        :param writer: asyncio StreamWriter of the connection
+        """
+        session = None
+        task = asyncio.current_task()
+        self.connections[task] = writer
+
+        try:
+            magic = await reader.readexactly(4)
+
+            if magic == WATCH_MAGIC:
+                magic, sessionId = WATCH.unpack(magic + await reader.readexactly(WATCH.size - 4))
+                await self.spectate(reader, writer, sessionId)
+                return
+
+            magic, diff = HELLO.unpack(magic + await reader.readexactly(HELLO.size - 4))
+
+            if magic != CLIENT_MAGIC or not MIN_DIFF <= diff <= MAX_DIFF or self.sessionCount >= self.maxSessions:
+                return
+
+            session = Session(self.nextId, diff, self.board, writer)
+            self.nextId += 1
+            writer.write(session.welcome())
+            self.join(session)
+
+            while True:
+                data = await reader.read(64)
+
+                if not data:
+                    break
+
+                for byte in data:
+                    if byte <= 3:
+                        session.direction = byte
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if session:
+                self.leave(session)
+                session.close()
+
+            del self.connections[task]
+            writer.close()
+
+    async def spectate(self, reader, writer, sessionId):
+        """
+        Feeds a session to a spectator until either of them leaves.
+
+        :param reader: asyncio StreamReader of the spectator's connection
+        :param writer: asyncio StreamWriter of the spectator's connection
+        :param sessionId: Session to watch
+        """
+        session = self.sessions.get(sessionId)
+
+        if session is None:
+            return
+
+        subscriber = StreamSubscriber(writer, self.spectatorLimit)
+        writer.write(session.watching())
+        session.broadcaster.subscribe(subscriber, session.engine)
+        self.spectatorCount += 1
+
+        try:
+            while await reader.read(64):  # Spectators have nothing to say, this only notices when they leave
+                pass
+        finally:
+            session.broadcaster.unsubscribe(subscriber)
+            self.spectatorCount -= 1
+
+    def join(self, session):
+        """
+        Adds a session to the group of its diff, starting the group's task if needed.
+
+        :param session: The Session
+        """
+        group = self.groups.get(session.diff)
+
+        if group is None:
+            group = self.groups[session.diff] = set()
+            self.tickers[session.diff] = asyncio.get_running_loop().create_task(self.run(session.diff, group))
+
+        group.add(session)
+        self.sessions[session.id] = session
+        self.sessionCount += 1
+
+    def leave(self, session):
+        """
+        Removes a session. A group's task stops once its last session has left.
+
+        :param session: The Session
+        """
+        group = self.groups.get(session.diff)
+
+        if group is not None and session in group:
+            group.discard(session)
+            del self.sessions[session.id]
+            self.sessionCount -= 1
+
+            if not group:
+                del self.groups[session.diff]
+                self.tickers.pop(session.diff).cancel()
+
+    async def run(self, diff, group):
+        """
+        Ticks every session of a group at the group's rate until the group empties.
+
+        :param diff: Milliseconds per tick
+        :param group: Set of the group's Sessions
+        """
+        loop = asyncio.get_running_loop()
+        clock = FixedStepClock(diff / 1000, clock=loop.time)
+
+        while True:
+            await asyncio.sleep(max(0.0, clock.nextTick - loop.time()))
+
+            for _ in range(clock.due()):
+                for session in list(group):
+                    try:
+                        session.tick(self.sendLimit)
+                    except Exception:
+                        log.exception("Session %d failed on tick %d, closing it", session.id, session.engine.ticks)
+                        self.leave(session)
+                        session.close()
+                        continue
+
+                    self.ticks += 1
+
+                    if session.engine.done:  # The final state has been sent, the connections close
+                        self.gamesPlayed += 1
+                        self.leave(session)
+                        session.close()
+
+                if not group:
+                    return
+
+
+async def serve(host, port, board):
+    """
+    Runs a server until it is interrupted.
+
+    :param host: Address to listen on
+    :param port: Port to listen on
+    :param board: Board every session plays on
+    """
+    server = GameServer(board)
+    port = await server.start(host, port)
+    print("Listening on %s:%d" % (host, port))
+
+    while True:
+        await asyncio.sleep(10)
+        print("%d sessions, %d spectators, %d games played, %d ticks" % (server.sessionCount, server.spectatorCount,
+                                                                          server.gamesPlayed, server.ticks))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the multiplayer game server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--board", type=Board.parse, default=DEFAULT_BOARD, help="board size, e.g. 40x40")
+    args = parser.parse_args()
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.board))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,468 @@
+# -*- coding: UTF-8 -*-
+"""
+Headless Snake engine.
+
+This module re-implements the rules of snakeGame.py (Snake.move, Snake.addSquare, snakeHit, goodSnackPos and newSnack)
+without importing pygame, so games can be simulated as fast as the CPU allows and without a display. Positions are
+stored in cells rather than pixels: cell (x, y) is drawn at pixel (x * cellSize, y * cellSize) by the game.
+
+The board defaults to the game's original 30 x 30 cells but can be any size (see Board). Moving and collisions only
+look at the snake's ends, so their cost does not grow with the board. Spawning counts the covered cells per block of
+rows (see FreeCells), so a pick costs O(sqrt(rows)) steps plus popcounts over one row, and the memory it needs grows
+with the length of the snake rather than the area of the board.
+"""
+import random
+from collections import deque, namedtuple
+from math import isqrt
+
+# The original board, used unless a Board says otherwise
+CELL_SIZE = 20  # Width and height of a Square in pixels
+COLS = 30  # Number of cells across the 600px window
+ROWS = 30  # Number of cells down the 600px window
+SNACK_MIN = 1  # Smallest cell a snack can spawn in (Not including borders)
+SNACK_MAX = 28  # Largest cell a snack can spawn in (Not including borders)
+START = (5, 15)  # Cell of the head when a game starts (100, 300 in pixels)
+
+# Directions, listed in the same priority order that Snake.move() reads the keys in
+UP = 0
+LEFT = 1
+DOWN = 2
+RIGHT = 3
+VELOCITIES = ((0, -1), (-1, 0), (0, 1), (1, 0))  # Cell offset of one move in each direction
+DIRECTIONS = {velocity: direction for direction, velocity in enumerate(VELOCITIES)}  # Cell offset -> direction
+
+try:
+    popcount = int.bit_count  # Python 3.10+
+except AttributeError:
+    def popcount(mask):
+        """
+        :param mask: A non-negative int
+        :return: The number of bits set in it
+        """
+        return bin(mask).count("1")
+
+
+State = namedtuple("State", ["head", "direction", "snack", "length", "score", "ticks"])
+
+
+class Board(namedtuple("Board", ["cols", "rows", "cellSize"])):
+    """
+    Size of a board: cols x rows cells, each drawn cellSize pixels wide by the game. As on the original board, snacks
+    spawn anywhere but the outermost ring of cells and the snake starts 5 cells from the left edge, half way down.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, cols=COLS, rows=ROWS, cellSize=CELL_SIZE):
+        """
+        Creates a board.
+
+        :param cols: Number of cells across (at least 4)
+        :param rows: Number of cells down (at least 4)
+        :param cellSize: Width and height of a cell in pixels
+        """
+        if cols < 4 or rows < 4 or cellSize < 1:
+            raise ValueError("a board needs at least 4 x 4 cells of at least 1 pixel")
+
+        return super(Board, cls).__new__(cls, cols, rows, cellSize)
+
+    @classmethod
+    def parse(cls, size, cellSize=CELL_SIZE):
+        """
+        Reads a board size written as "COLSxROWS", e.g. "1000x1000".
+
+        :param size: The size
+        :param cellSize: Width and height of a cell in pixels
+        :return: The Board
+        """
+        try:
+            cols, rows = size.lower().split("x")
+            return cls(int(cols), int(rows), int(cellSize))
+        except ValueError:
+            raise ValueError("board size should look like 30x30, not " + repr(size))
+
+    @property
+    def width(self):
+        """
+        :return: Width of the board in pixels
+        """
+        return self.cols * self.cellSize
+
+    @property
+    def height(self):
+        """
+        :return: Height of the board in pixels
+        """
+        return self.rows * self.cellSize
+
+    @property
+    def start(self):
+        """
+        :return: Cell of the head when a game starts
+        """
+        return min(START[0], self.cols // 2), self.rows // 2
+
+    def freeCells(self):
+        """
+        :return: A FreeCells index of the cells a snack can spawn in, all free
+        """
+        return FreeCells(SNACK_MIN, SNACK_MIN, self.cols - 1 - SNACK_MIN, self.rows - 1 - SNACK_MIN)
+
+
+class GameRng(object):
+    """
+    This class is the random generator of one game (SplitMix64). Its whole state is a single 64-bit int, so a game can
+    be reproduced from its seed and resumed from a replay keyframe.
+    """
+
+    MASK = (1 << 64) - 1
+
+    def __init__(self, seed=None):
+        """
+        Creates a generator.
+
+        :param seed: Int seed (None seeds from the OS)
+        """
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        """
+        Restarts the generator.
+
+        :param seed: Int seed (None seeds from the OS)
+        """
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+
+        self.state = seed & self.MASK
+
+    def next(self):
+        """
+        :return: The next random 64-bit int
+        """
+        self.state = z = (self.state + 0x9E3779B97F4A7C15) & self.MASK
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & self.MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & self.MASK
+        return z ^ (z >> 31)
+
+    def below(self, n):
+        """
+        :param n: Number of possible values
+        :return: A random int from 0 to n - 1
+        """
+        return (self.next() * n) >> 64
+
+
+class FreeCells(object):
+    """
+    This class keeps track of the cells a snack may spawn in (a rectangle of the board) that are not covered by the
+    snake. The covered cells are stored as one bitmask per row, and counted per block of about sqrt(rows) rows, so
+    covering or freeing a cell is O(1). A random pick counts through the blocks, then the rows of its block, then finds
+    its column by halving the row's bitmask, so it needs no retries, costs O(sqrt(rows)) steps whatever the snake
+    covers, and its result only depends on which cells are covered, not on the order they were covered in.
+    """
+
+    def __init__(self, minX, minY, maxX, maxY):
+        """
+        Creates the index with every cell free.
+
+        :param minX: Leftmost column a snack can spawn in
+        :param minY: Top row a snack can spawn in
+        :param maxX: Rightmost column a snack can spawn in
+        :param maxY: Bottom row a snack can spawn in
+        """
+        self.minX = minX
+        self.minY = minY
+        self.maxX = maxX
+        self.maxY = maxY
+        self.width = maxX - minX + 1
+        self.height = maxY - minY + 1
+        self.size = self.width * self.height  # Number of snack cells
+        self.rows = {}  # Row -> bitmask of its covered cells (bit 0 is column minX), for rows with any covered cell
+        self.block = isqrt(self.height)  # Rows per block
+        self.blocks = [0] * -(-self.height // self.block)  # Covered cells of each block, the last one may be shorter
+        self.covered = 0  # Number of covered snack cells
+
+    def __len__(self):
+        """
+        :return: The number of free cells
+        """
+        return self.size - self.covered
+
+    def remove(self, cell):
+        """
+        Marks a cell as covered. Cells that snacks can not spawn in are ignored.
+
+        :param cell: The cell the snake has moved onto
+        """
+        x, y = cell
+
+        if x < self.minX or x > self.maxX or y < self.minY or y > self.maxY:  # Not a snack cell
+            return
+
+        bit = 1 << (x - self.minX)
+        row = self.rows.get(y, 0)
+
+        if not row & bit:
+            self.rows[y] = row | bit
+            self.covered += 1
+            self.blocks[(y - self.minY) // self.block] += 1
+
+    def add(self, cell):
+        """
+        Marks a cell as free again. Cells that snacks can not spawn in are ignored.
+
+        :param cell: The cell the snake has moved off of
+        """
+        x, y = cell
+
+        if x < self.minX or x > self.maxX or y < self.minY or y > self.maxY:  # Not a snack cell
+            return
+
+        bit = 1 << (x - self.minX)
+        row = self.rows.get(y, 0)
+
+        if row & bit:
+            row ^= bit
+
+            if row:
+                self.rows[y] = row
+            else:
+                del self.rows[y]  # Only rows with covered cells are kept
+
+            self.covered -= 1
+            self.blocks[(y - self.minY) // self.block] -= 1
+
+    def copy(self):
+        """
+        :return: An independent FreeCells with the same cells covered
+        """
+        cells = FreeCells(self.minX, self.minY, self.maxX, self.maxY)
+        cells.rows = dict(self.rows)
+        cells.blocks = list(self.blocks)
+        cells.covered = self.covered
+
+        return cells
+
+    def choice(self, rng):
+        """
+        Picks a free cell uniformly at random.
+
+        :param rng: GameRng to draw from
+        :return: A free cell, or None if the snake covers every cell
+        """
+        free = self.size - self.covered
+
+        if not free:
+            return None
+
+        k = rng.below(free)  # Index of the pick among the free cells, counted row by row
+        width = self.width
+        blockCells = self.block * width
+        y = self.minY  # First row of the block being counted
+
+        # The last block may be shorter, but k always falls in it once the others are skipped, so its size never matters
+        for covered in self.blocks:
+            blockFree = blockCells - covered
+
+            if k < blockFree:
+                break
+
+            k -= blockFree
+            y += self.block
+
+        rows = self.rows
+        row = rows.get(y, 0)
+        rowFree = width - popcount(row)
+
+        while k >= rowFree:  # Skips the rows of the block before the pick's
+            k -= rowFree
+            y += 1
+            row = rows.get(y, 0)
+            rowFree = width - popcount(row)
+
+        x = 0  # First column of the part of the row still searched
+        span = width
+
+        # Halves the row until one cell is left, the k-th free cell is in the left half if that has more than k free
+        while span > 1:
+            half = span >> 1
+            leftFree = half - popcount(row >> x & ((1 << half) - 1))
+
+            if k < leftFree:
+                span = half
+            else:
+                k -= leftFree
+                x += half
+                span -= half
+
+        return (self.minX + x, y)
+
+
+DEFAULT_BOARD = Board()  # The board of the original game
+
+
+class SnakeEngine(object):
+    """
+    This class simulates one game of Snake. The body is a deque of cells (head first) with a parallel deque holding the
+    direction each cell was entered in, which is what Snake.addSquare() uses to place a new tail.
+    """
+
+    def __init__(self, seed=None, board=DEFAULT_BOARD):
+        """
+        Creates an engine and starts a game.
+
+        :param seed: Seed for the snack generator (None seeds from the OS)
+        :param board: Board to play on
+        """
+        self.board = board
+        self.rng = GameRng()  # Per-game generator, so games can be reproduced from their seed
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """
+        Starts a new game with a snake of size 1.
+
+        :param seed: Seed for the snack generator (None seeds from the OS)
+        :return: The starting State
+        """
+        start = self.board.start
+        self.rng.seed(seed)
+        self.body = deque([start])  # Cells of the snake, head first
+        self.dirs = deque([RIGHT])  # Direction each cell of the body was entered in
+        self.occupied = {start}  # Set of cells covered by the body
+        self.free = self.board.freeCells()  # Snack cells not covered by the body
+        self.free.remove(start)
+        self.direction = RIGHT  # Current direction of the head
+        self.score = 0
+        self.ticks = 0
+        self.done = False
+        self.won = False  # True once the snake covers every cell a snack could spawn in
+        self.snack = self.placeSnack()
+
+        return self.state()
+
+    def state(self):
+        """
+        Builds a State tuple describing the current game.
+
+        :return: The current State
+        """
+        return State(self.body[0], self.direction, self.snack, len(self.body), self.score, self.ticks)
+
+    def rebuild(self, body, dirs, direction, snack, score, ticks):
+        """
+        Puts the engine in the middle of a game, e.g. one restored from a replay keyframe. The generator state is not
+        touched and has to be set separately.
+
+        :param body: Cells of the snake, head first
+        :param dirs: Direction each cell of the body was entered in
+        :param direction: Current direction of the head
+        :param snack: Cell of the snack
+        :param score: Current score
+        :param ticks: Ticks played so far
+        """
+        self.body = deque(body)
+        self.dirs = deque(dirs)
+        self.occupied = set(self.body)
+        self.free = self.board.freeCells()
+
+        for cell in self.occupied:
+            self.free.remove(cell)
+
+        self.direction = direction
+        self.snack = snack
+        self.score = score
+        self.ticks = ticks
+        self.done = False
+        self.won = False
+
+    def placeSnack(self):
+        """
+        Picks a snack cell the same way newSnack() does, uniformly from the free snack cells.
+
+        :return: The (x, y) cell of the new snack, or None if there is no free cell left
+        """
+        return self.free.choice(self.rng)
+
+    def step(self, action=None):
+        """
+        Advances the game by one tick, like one pass of the loop in main().
+
+        :param action: UP, LEFT, DOWN or RIGHT, or None to keep moving in the current direction (no key pressed)
+        :return: (state, reward, done), where reward is the number of snacks eaten during the tick
+        """
+        reward = self.advance(action)
+
+        return self.state(), reward, self.done
+
+    def advance(self, action=None):
+        """
+        Advances the game by one tick without building a State, for callers that only need the end result.
+
+        :param action: UP, LEFT, DOWN or RIGHT, or None to keep moving in the current direction (no key pressed)
+        :return: The number of snacks eaten during the tick (check self.done to see if the game is over)
+        """
+        if self.done:
+            raise RuntimeError("step() called on a finished game, call reset() first")
+
+        if action is not None:
+            self.direction = action
+
+        body = self.body
+        occupied = self.occupied
+        cols, rows, cellSize = self.board
+        dX, dY = VELOCITIES[self.direction]
+        headX, headY = body[0]
+        x = headX + dX
+        y = headY + dY
+
+        # Same boundaries as Snake.move(), the head reappears on the opposite side of the board
+        if x >= cols:
+            x = 0
+        elif x < 0:
+            x = cols - 1
+        elif y >= rows:
+            y = 0
+        elif y < 0:
+            y = rows - 1
+
+        head = (x, y)
+        tail = body.pop()  # Every Square moves up one place, so the tail's cell is vacated
+        self.dirs.pop()
+        occupied.discard(tail)
+        self.free.add(tail)
+        self.ticks += 1
+
+        # Backing into the old tail cell counts as a hit, as does running into any other body part
+        if head == tail or head in occupied:
+            self.done = True
+            body.appendleft(head)
+            self.dirs.appendleft(self.direction)
+            return 0
+
+        body.appendleft(head)
+        self.dirs.appendleft(self.direction)
+        occupied.add(head)
+        self.free.remove(head)
+
+        if head != self.snack:
+            return 0
+
+        # Snake.addSquare() puts the new tail behind the current one without wrapping it around the window
+        tailX, tailY = body[-1]
+        tailDir = self.dirs[-1]
+        dX, dY = VELOCITIES[tailDir]
+        newTail = (tailX - dX, tailY - dY)
+        body.append(newTail)
+        self.dirs.append(tailDir)
+        occupied.add(newTail)
+        self.free.remove(newTail)
+        self.score += 1
+        self.snack = self.placeSnack()
+
+        if self.snack is None:  # The board is full, so the game is won
+            self.done = True
+            self.won = True
+
+        return 1
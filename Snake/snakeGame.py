@@ -1,8 +1,26 @@
 # -*- coding: UTF-8 -*-
+import os
 import random
 import pygame
-from pygame import mixer
-from copy import deepcopy
+from collections import deque
+from assets import EATING, THUD, assets, sounds
+from autopilot import Autopilot
+from bitboard import Bitboard
+from gameClock import FixedStepClock
+from highScores import HighScoreStore
+from profiler import NullProfiler, TickProfiler, clockRates
+from replay import Replay
+from snakeEngine import COLS, DIRECTIONS, DOWN, LEFT, RIGHT, ROWS, UP, Board, GameRng, SnakeEngine
+
+highScores = HighScoreStore("data/highscores.txt")  # Loaded once, only written when a score changes
+REPLAY_DIR = os.environ.get("SNAKE_REPLAY_DIR")  # Folder a replay of every game is saved to, if set
+PROFILE_PATH = os.environ.get("SNAKE_PROFILE")  # File (.csv or .json) the frame timings are written to, if set
+# Board size in cells ("COLSxROWS") and cell size in pixels, boards larger than the window scroll
+BOARD = Board.parse(os.environ.get("SNAKE_BOARD", "30x30"), os.environ.get("SNAKE_CELL_SIZE", 20))
+AUTOPILOT_DIFF = 50  # Milliseconds per tick when the autopilot plays, faster than Hard
+AUDIO = os.environ.get("SNAKE_AUDIO", "1") != "0"  # SNAKE_AUDIO=0 runs without sound, the mixer is never started
+# Pre-baked images and texts (see bakeAssets.py), loaded at startup if the file exists
+BUNDLE_PATH = os.environ.get("SNAKE_ASSET_BUNDLE", "data/assets.bundle")
 
 
 class Square(object):
@@ -10,16 +28,17 @@ class Square(object):
     This class constructs a Square object, which is used to the display the Snake's parts and the snack.
     """
 
-    def __init__(self, posX, posY, color):
+    def __init__(self, posX, posY, color, size=20):
         """
         Creates a Square object.
 
         :param posX: The X coordinate for the Square
         :param posY: The Y coordinate for the Square
         :param color: The Square's color
+        :param size: Width and height of the Square in pixels (the board's cell size)
         """
-        self.width = 20  # Width of the square (20x20)
-        self.height = 20  # Height of the square (20x20)
+        self.width = size  # Width of the square (20x20 by default)
+        self.height = size  # Height of the square (20x20 by default)
         self.color = color  # Sets the color to the parameterized color
         self.posX = posX  # Sets the X position to the position indicated by the posX parameter
         self.posY = posY  # Sets the Y position to the position indicated by the posX parameter
@@ -49,16 +68,24 @@ class Square(object):
 
 class Snake(object):
     """
-    This class constructs a Snake object, which is represented as a list (self.body) of Squares.
+    This class constructs a Snake object, which is represented as a deque (self.body) of Squares, head first.
     """
 
-    def __init__(self):
+    def __init__(self, board=BOARD):
         """
         Default constructor for the Snake.
+
+        :param board: Board the snake plays on
         """
-        self.body = []  # Sets the body to an empty list
-        self.head = Square(100, 300, (255, 255, 255))  # Creates head
+        self.board = board
+        self.size = board.cellSize  # Width and height of every Square
+        startX, startY = board.start
+        self.body = deque()  # Sets the body to an empty ring buffer (head on the left, tail on the right)
+        self.occupied = {}  # Maps every (posX, posY) covered by the body to the number of Squares on it
+        self.free = board.freeCells()  # Cells (position / size) a snack can spawn in that the body does not cover
+        self.head = Square(startX * self.size, startY * self.size, (255, 255, 255), self.size)  # Creates head
         self.body.append(self.head)  # Appends head to body
+        self.occupy(self.head.posX, self.head.posY)
 
     def reset(self, posX, posY):
         """
@@ -66,125 +93,148 @@ class Snake(object):
         :param posX: The X coordinate where snake should start again
         :param posY: The Y coordinate where snake should start again
         """
-        self.body = []
-        self.head = Square(posX, posY, (255, 255, 255))
+        self.body = deque()
+        self.occupied = {}
+        self.free = self.board.freeCells()
+        self.head = Square(posX, posY, (255, 255, 255), self.size)
         self.body.append(self.head)
+        self.occupy(posX, posY)
+
+    def occupy(self, posX, posY):
+        """
+        Marks a position as covered by one more Square of the body.
+
+        :param posX: The X coordinate of the Square
+        :param posY: The Y coordinate of the Square
+        """
+        pos = (posX, posY)
+        count = self.occupied.get(pos, 0) + 1
+        self.occupied[pos] = count
+
+        if count == 1:  # The position was free until now
+            self.free.remove((posX // self.size, posY // self.size))
+
+    def vacate(self, posX, posY):
+        """
+        Marks a position as covered by one less Square of the body.
 
-    def move(self, vX, vY):
+        :param posX: The X coordinate of the Square
+        :param posY: The Y coordinate of the Square
+        """
+        pos = (posX, posY)
+        count = self.occupied[pos] - 1
+
+        if count:
+            self.occupied[pos] = count
+        else:
+            del self.occupied[pos]  # Only positions under the snake are kept, so lookups stay O(1)
+            self.free.add((posX // self.size, posY // self.size))
+
+    def move(self, vX, vY, direction=None):
         """
         Move function for the Snake. Utilizes the arrow keys for snake movement.
 
+        Only the two ends of the snake change on a move, so the tail Square is popped off the body and pushed back on
+        as the new head. Every other Square keeps its position and direction, which makes a move O(1).
+
         :param vX: Snake's current velocity of X coordinate
         :param vY: Snake's current velocity of Y coordinate
+        :param direction: UP, LEFT, DOWN or RIGHT to move in instead of reading the keys (used by the autopilot)
         :return vX, vY, flag
         """
-        keys = pygame.key.get_pressed()  # Reads if a key has been pressed
+        if direction is None:
+            keys = pygame.key.get_pressed()  # Reads if a key has been pressed
+            up = keys[pygame.K_w] or keys[pygame.K_UP]
+            left = keys[pygame.K_a] or keys[pygame.K_LEFT]
+            down = keys[pygame.K_s] or keys[pygame.K_DOWN]
+            right = keys[pygame.K_d] or keys[pygame.K_RIGHT]
+        else:
+            up, left, down, right = (direction == key for key in (UP, LEFT, DOWN, RIGHT))
+
+        size = self.size
         flag = False  # Flag to check if a Snake of len 2 has backed into its tail
-        lastX = self.body[-1].posX  # Initial X position of tail
-        lastY = self.body[-1].posY  # Initial Y position of tail
-        self.reorganize()  # Reorganizes the whole snake, leaving only the head to be changed
+        head = self.head
+        # The new head starts with the current head's direction, which is kept if no key is pressed
+        dirRight, dirLeft, dirUp, dirDown = head.dirRight, head.dirLeft, head.dirUp, head.dirDown
 
-        if keys[pygame.K_w] or keys[pygame.K_UP]:  # If the "W" or "UP" key is pressed, changes the head's direction
+        if up:  # If the "W" or "UP" key is pressed, changes the head's direction
             # upwards
-            self.head.dirRight = 0
-            self.head.dirLeft = 0
-            self.head.dirDown = 0
-            self.head.dirUp = 1
+            dirRight, dirLeft, dirUp, dirDown = 0, 0, 1, 0
             vX = 0
-            vY = -20
+            vY = -size
 
-        elif keys[pygame.K_a] or keys[pygame.K_LEFT]:  # If the "A" or "LEFT" key is pressed, changes the head's
+        elif left:  # If the "A" or "LEFT" key is pressed, changes the head's
             # direction to the left
-            self.head.dirRight = 0
-            self.head.dirLeft = 1
-            self.head.dirDown = 0
-            self.head.dirUp = 20
-            vX = -20
+            dirRight, dirLeft, dirUp, dirDown = 0, 1, 0, 0
+            vX = -size
             vY = 0
 
-        elif keys[pygame.K_s] or keys[pygame.K_DOWN]:  # If the "S" or "DOWN" key is pressed, changes the head's
+        elif down:  # If the "S" or "DOWN" key is pressed, changes the head's
             # direction downwards
-            self.head.dirRight = 0
-            self.head.dirLeft = 0
-            self.head.dirDown = 1
-            self.head.dirUp = 0
+            dirRight, dirLeft, dirUp, dirDown = 0, 0, 0, 1
             vX = 0
-            vY = 20
+            vY = size
 
-        elif keys[pygame.K_d] or keys[pygame.K_RIGHT]:  # If the "D" or "RIGHT" key is pressed, changes the head's
+        elif right:  # If the "D" or "RIGHT" key is pressed, changes the head's
             # direction to the right
-            self.head.dirRight = 1
-            self.head.dirLeft = 0
-            self.head.dirDown = 0
-            self.head.dirUp = 0
-            vX = 20
+            dirRight, dirLeft, dirUp, dirDown = 1, 0, 0, 0
+            vX = size
             vY = 0
 
-        self.head.posX += vX  # Alters the vX value if movement is left or right
-        self.head.posY += vY  # Alters the vY value if movement is upwards or downwards
+        posX = head.posX + vX  # Alters the vX value if movement is left or right
+        posY = head.posY + vY  # Alters the vY value if movement is upwards or downwards
 
-        # These four if/elif statements control the boundaries, so the snake does not disappear out of screen.
-        if self.head.posX >= 600:  # If the head's position is too far right, it will reappear in left side.
-            self.head.posX = 0
-        elif self.head.posX < 0:  # If the head's position is too far left, it will reappear in the right side.
-            self.head.posX = 580
-        elif self.head.posY >= 600:  # If the head's position is too low, it will reappear in the top.
-            self.head.posY = 0
-        elif self.head.posY < 0:  # If the head's position is too high, it will reappear in the bottom.
-            self.head.posY = 580
+        # These four if/elif statements control the boundaries, so the snake does not disappear off the board.
+        if posX >= self.board.width:  # If the head's position is too far right, it will reappear in left side.
+            posX = 0
+        elif posX < 0:  # If the head's position is too far left, it will reappear in the right side.
+            posX = self.board.width - size
+        elif posY >= self.board.height:  # If the head's position is too low, it will reappear in the top.
+            posY = 0
+        elif posY < 0:  # If the head's position is too high, it will reappear in the bottom.
+            posY = self.board.height - size
 
-        if self.head.posX == lastX and self.head.posY == lastY:  # Checks if snake has backed into its tail
-            flag = True
+        tail = self.body.pop()  # Pops the tail, its Square is recycled as the new head
+        self.vacate(tail.posX, tail.posY)
 
-        return vX, vY, flag
+        if posX == tail.posX and posY == tail.posY:  # Checks if snake has backed into its tail
+            flag = True
 
-    def reorganize(self):
-        """
-        Reorganizes the snake. Utilizing a copy of the body list, every Square (except the head) is updated to the
-        values of the Square before it.
-        """
-        newBody = deepcopy(self.body)  # Makes a deepcopy of the body (Will be used to make the changes to self.body)
+        tail.move(posX, posY, dirRight, dirLeft, dirUp, dirDown)
+        self.body.appendleft(tail)  # Pushes the new head onto the front of the body
+        self.occupy(posX, posY)
+        self.head = tail
 
-        # For every square in the self.body array, its position will be updated to the square before it.
-        for index, square in enumerate(self.body):
-            if square == self.body[0]:  # Skips the head
-                continue
-            else:
-                self.body[index].move(newBody[index - 1].posX, newBody[index - 1].posY,
-                                      newBody[index - 1].dirRight,
-                                      newBody[index - 1].dirLeft, newBody[index - 1].dirUp,
-                                      newBody[index - 1].dirDown)
+        return vX, vY, flag
 
     def addSquare(self):
         """
         Adds a Square to the tail of the snake.
         """
-        mixer.music.load("data/eating.wav")  # Eating sound
-        mixer.music.set_volume(0.05)  # Reduces eating sound volume
-        mixer.music.play()  # Plays eating sound
+        sounds.play(EATING)  # Eating sound, preloaded by openWindow()
         tail = self.body[-1]  # Tail of the current snake
+        size = self.size
 
         if tail.dirDown == 1:  # If the tail's direction is facing down, adds a new Square above the current tail
-            newTail = Square(tail.posX, tail.posY - 20, (255, 255, 255))
+            newTail = Square(tail.posX, tail.posY - size, (255, 255, 255), size)
             newTail.dirDown = 1
             newTail.dirRight = 0
-            self.body.append(newTail)
 
         elif tail.dirUp == 1:  # If the tail's direction is facing down, adds a new Square below the tail
-            newTail = Square(tail.posX, tail.posY + 20, (255, 255, 255))
+            newTail = Square(tail.posX, tail.posY + size, (255, 255, 255), size)
             newTail.dirUp = 1
             newTail.dirRight = 0
-            self.body.append(newTail)
 
         elif tail.dirRight == 1:  # If the tail's direction is facing down, adds a new Square to the left of the tail
-            newTail = Square(tail.posX - 20, tail.posY, (255, 255, 255))
-            self.body.append(newTail)
+            newTail = Square(tail.posX - size, tail.posY, (255, 255, 255), size)
 
         elif tail.dirLeft == 1:  # If the tail's direction is facing left, adds a new Square to the right of the tail
-            newTail = Square(tail.posX + 20, tail.posY, (255, 255, 255))
+            newTail = Square(tail.posX + size, tail.posY, (255, 255, 255), size)
             newTail.dirLeft = 1
             newTail.dirRight = 0
-            self.body.append(newTail)
+
+        self.body.append(newTail)
+        self.occupy(newTail.posX, newTail.posY)
 
     def draw(self, window):
         """
@@ -196,6 +246,54 @@ class Snake(object):
             pygame.draw.rect(window, square.color, (square.posX, square.posY, square.width, square.height))
 
 
+class BitboardSnake(Snake):
+    """
+    Snake that also keeps the cells it covers in a Bitboard (self.bits), so bots can ask whether cells are free and how
+    much space is reachable without scanning the body. It is used exactly like a Snake.
+    """
+
+    def __init__(self, board=BOARD):
+        """
+        Creates the snake.
+
+        :param board: Board the snake plays on
+        """
+        self.bits = Bitboard(board)  # Filled in by occupy(), which Snake.__init__() calls for the head
+        Snake.__init__(self, board)
+
+    def reset(self, posX, posY):
+        """
+        Resets the snake to size 1, see Snake.reset().
+
+        :param posX: The X coordinate where snake should start again
+        :param posY: The Y coordinate where snake should start again
+        """
+        self.bits = Bitboard(self.board)
+        Snake.reset(self, posX, posY)
+
+    def occupy(self, posX, posY):
+        """
+        Marks a position as covered by one more Square of the body.
+
+        :param posX: The X coordinate of the Square
+        :param posY: The Y coordinate of the Square
+        """
+        Snake.occupy(self, posX, posY)
+        self.bits.add((posX // self.size, posY // self.size))
+
+    def vacate(self, posX, posY):
+        """
+        Marks a position as covered by one less Square of the body.
+
+        :param posX: The X coordinate of the Square
+        :param posY: The Y coordinate of the Square
+        """
+        Snake.vacate(self, posX, posY)
+
+        if (posX, posY) not in self.occupied:  # No other Square left on it
+            self.bits.discard((posX // self.size, posY // self.size))
+
+
 class Button:
     """
     Button class that creates the buttons for various seen in different screens, i.e. main menu
@@ -227,12 +325,25 @@ class Button:
         pygame.draw.rect(window, (25, 79, 41),
                          (round(self.x - 3), round(self.y - 3), round(self.width + 6), round(self.height + 6)), 0)
         pygame.draw.rect(window, self.color, (round(self.x), round(self.y), round(self.width), round(self.height)), 0)
-        font = pygame.font.Font("data/8-bit-pusab.ttf", 20)
-        buttonText = font.render(self.text, False, (255, 255, 255))
+        font = assets.font(20)
+        buttonText = assets.text(font, self.text, False, (255, 255, 255))
         blitX = int(self.x + (self.width / 2 - buttonText.get_width() / 2))
         blitY = int(self.y + (self.height / 2 - buttonText.get_height() / 2))
         window.blit(buttonText, (blitX, blitY))
 
+    def highlight(self, pos):
+        """
+        Lights the button up if the mouse is above it, and back down otherwise.
+
+        :param pos: Position of mouse
+        :return: True if the button's color changed, so it has to be redrawn
+        """
+        color = (124, 230, 124) if self.hover(pos) else (107, 199, 107)
+        changed = color != self.color
+        self.color = color
+
+        return changed
+
     def hover(self, pos):
         """
         Checks if the mouse position is above the button.
@@ -247,6 +358,21 @@ class Button:
         return False
 
 
+def waitForEvents(timeout=500):
+    """
+    Sleeps until something happens, so idle screens do not use any CPU.
+
+    :param timeout: Most milliseconds to wait for
+    :return: List of the events that happened (empty if the wait timed out)
+    """
+    event = pygame.event.wait(timeout)
+
+    if event.type == pygame.NOEVENT:
+        return []
+
+    return [event] + pygame.event.get()
+
+
 def redraw(window, snake, snack, score):
     """
     Function to redraw the window after every movement.
@@ -257,8 +383,21 @@ def redraw(window, snake, snack, score):
     :param score: The current score
     """
     window.fill((47, 48, 47))  # Fills background with a GRAY color
-    font = pygame.font.Font("data/8-bit-pusab.ttf", 20)  # Font used to display score
-    scoreText = font.render(str(score), True, (255, 255, 255))  # Renders score text
+    drawScore(window, score)
+    snake.draw(window)  # Calls the snake's draw function
+    drawSnack(window, snack, snack.color)  # Draws snack
+    pygame.display.update()
+
+
+def drawScore(window, score):
+    """
+    Draws the current score in the top right corner.
+
+    :param window: Window that contains the board
+    :param score: The current score
+    """
+    font = assets.font(20)  # Font used to display score
+    scoreText = assets.text(font, str(score), True, (255, 255, 255))  # Renders score text
 
     if score > 99:
         window.blit(scoreText, [535, 10])
@@ -267,9 +406,273 @@ def redraw(window, snake, snack, score):
     else:
         window.blit(scoreText, [565, 10])  # Blit's text to window depending on current score
 
-    snake.draw(window)  # Calls the snake's draw function
-    drawSnack(window, snack, snack.color)  # Draws snack
-    pygame.display.update()
+
+class DirtyRenderer:
+    """
+    Renderer that only repaints what changed since the last frame. Between two ticks the only cells that can change
+    are the old tail, the new head, a new tail added by addSquare(), the old and new snack, and the score in the corner.
+    When more than one tick runs before a frame, mark() is called after each of them to collect those cells.
+
+    A board larger than the window is shown through a view that scrolls to keep the head away from its edges. Only a
+    scroll repaints the whole window, and that only looks at the cells in view, however long the snake or large the
+    board.
+    """
+
+    scoreArea = pygame.Rect(520, 0, 80, 60)  # Cells covered by the score text
+    overlayArea = pygame.Rect(0, 0, 300, 136)  # Cells covered by the profiling overlay
+    margin = 5  # Cells kept between the head and the edges of the view
+
+    def __init__(self, window, board=BOARD):
+        """
+        Creates a renderer for a window.
+
+        :param window: Window that contains the board
+        :param board: Board being drawn
+        """
+        self.window = window
+        self.board = board
+        self.view = window.get_rect()  # Part of the board shown in the window, in board pixels
+        self.lastTail = None  # Position of the tail in the last frame
+        self.lastSnack = None  # Position of the snack in the last frame
+        self.lastScore = None  # Score shown in the last frame
+        self.dirty = set()  # Cells changed since the last frame
+        self.overlay = None  # Surface shown over overlayArea (the profiling overlay), if any
+        self.overlayDirty = False  # True if the overlay changed since the last frame
+
+    def follow(self, snake):
+        """
+        Scrolls the view if the head has come too close to one of its edges, centering the head again. The view
+        never leaves the board, so a board no larger than the window never scrolls.
+
+        :param snake: The snake on the board
+        :return: True if the view moved
+        """
+        size = self.board.cellSize
+        view = self.view
+        inner = view.inflate(-2 * self.margin * size, -2 * self.margin * size)
+
+        if inner.collidepoint(snake.head.posX, snake.head.posY):
+            return False
+
+        viewX = min(max(snake.head.posX - view.width // 2, 0), max(self.board.width - view.width, 0))
+        viewY = min(max(snake.head.posY - view.height // 2, 0), max(self.board.height - view.height, 0))
+        viewX -= viewX % size  # Keeps the cells lined up with the window
+        viewY -= viewY % size
+
+        if (viewX, viewY) == view.topleft:
+            return False
+
+        view.topleft = (viewX, viewY)
+        return True
+
+    def visible(self):
+        """
+        :return: Rect of the window the board shows in (the whole window unless the board is smaller)
+        """
+        boardRect = pygame.Rect(-self.view.x, -self.view.y, self.board.width, self.board.height)
+
+        return boardRect.clip(self.window.get_rect())
+
+    def cellsIn(self, area):
+        """
+        Lists the cells that show in part of the window.
+
+        :param area: Rect of the window
+        :return: Board positions of the cells that overlap the area
+        """
+        size = self.board.cellSize
+        viewX, viewY = self.view.topleft
+        left = (area.left + viewX) // size * size
+        top = (area.top + viewY) // size * size
+
+        return [(posX, posY) for posX in range(left, area.right + viewX, size)
+                for posY in range(top, area.bottom + viewY, size)]
+
+    def full(self, snake, snack, score):
+        """
+        Redraws the whole window. Used for the first frame of a game, after the view scrolls and after anything else
+        has drawn over it.
+
+        :param snake: The snake on the board
+        :param snack: The snack on the board
+        :param score: The current score
+        """
+        self.follow(snake)
+        visible = self.visible()
+        size = self.board.cellSize
+        viewX, viewY = self.view.topleft
+
+        if visible != self.window.get_rect():  # The board is smaller than the window, the rest is darker
+            self.window.fill((24, 24, 24))
+
+        self.window.fill((47, 48, 47), visible)  # Fills background with a GRAY color
+        self.window.fill((47, 48, 47), self.scoreArea)
+        drawScore(self.window, score)
+
+        if len(snake.body) < visible.width * visible.height // (size * size):  # Fewer Squares than cells in view
+            for square in snake.body:
+                rect = pygame.Rect(square.posX - viewX, square.posY - viewY, size, size)
+
+                if rect.colliderect(visible):  # New tails can be placed outside the board
+                    pygame.draw.rect(self.window, square.color, rect)
+        else:
+            for posX, posY in self.cellsIn(visible):
+                if (posX, posY) in snake.occupied:
+                    pygame.draw.rect(self.window, snake.head.color, (posX - viewX, posY - viewY, size, size))
+
+        pygame.draw.rect(self.window, snack.color, (snack.posX - viewX, snack.posY - viewY, size, size))
+
+        if self.overlay is not None:
+            self.window.blit(self.overlay, self.overlayArea)
+
+        pygame.display.update()
+        self.remember(snake, snack, score)
+
+    def setOverlay(self, overlay):
+        """
+        Shows a surface over the top left corner of the board from the next frame on.
+
+        :param overlay: Surface the size of overlayArea, or None to hide the overlay
+        """
+        self.overlay = overlay
+        self.overlayDirty = True
+
+    def draw(self, snake, snack, score):
+        """
+        Repaints the cells that changed since the last frame and updates only those parts of the display.
+
+        :param snake: The snake on the board
+        :param snack: The snack on the board
+        :param score: The current score
+        """
+        if self.lastTail is None or self.follow(snake):  # Nothing drawn yet, or everything in view has moved
+            self.full(snake, snack, score)
+            return
+
+        self.mark(snake, snack)
+        cells = self.dirty
+        self.dirty = set()
+        visible = self.visible()
+        size = self.board.cellSize
+        viewX, viewY = self.view.topleft
+        rects = []
+        scoreDirty = score != self.lastScore
+        overlayDirty = self.overlayDirty
+
+        for posX, posY in cells:
+            rect = pygame.Rect(posX - viewX, posY - viewY, size, size)
+
+            if not rect.colliderect(visible):  # Out of view, or a new tail placed outside the board
+                continue
+
+            if rect.colliderect(self.scoreArea):  # Repainted along with the score below
+                scoreDirty = True
+
+                if self.scoreArea.contains(rect):
+                    continue
+
+            self.paintCell(snake, snack, posX, posY)
+            rects.append(rect)
+
+            if self.overlay is not None and rect.colliderect(self.overlayArea):  # Painted over the overlay
+                overlayDirty = True
+
+        if scoreDirty:
+            self.window.fill((47, 48, 47), self.scoreArea)
+            drawScore(self.window, score)
+
+            # The snake and snack are drawn over the score, as redraw() does
+            for posX, posY in self.cellsIn(self.scoreArea):
+                self.paintCell(snake, snack, posX, posY, False)
+
+            rects.append(self.scoreArea)
+
+        if overlayDirty:
+            for posX, posY in self.cellsIn(self.overlayArea):
+                self.paintCell(snake, snack, posX, posY)
+
+            if self.overlay is not None:
+                self.window.blit(self.overlay, self.overlayArea)
+
+            rects.append(self.overlayArea)
+            self.overlayDirty = False
+
+        pygame.display.update(rects)
+        self.lastScore = score
+
+    def mark(self, snake, snack):
+        """
+        Collects the cells changed by the last tick, to be repainted by the next draw().
+
+        :param snake: The snake on the board
+        :param snack: The snack on the board
+        """
+        tail = snake.body[-1]
+        self.dirty.update((self.lastTail, (snake.head.posX, snake.head.posY), (tail.posX, tail.posY), self.lastSnack,
+                           (snack.posX, snack.posY)))
+        self.lastTail = (tail.posX, tail.posY)
+        self.lastSnack = (snack.posX, snack.posY)
+
+    def paintCell(self, snake, snack, posX, posY, clear=True):
+        """
+        Paints one cell of the board with whatever is on it.
+
+        :param snake: The snake on the board
+        :param snack: The snack on the board
+        :param posX: X coordinate of the cell on the board
+        :param posY: Y coordinate of the cell on the board
+        :param clear: True to fill the cell with the background first
+        """
+        size = self.board.cellSize
+        rect = (posX - self.view.x, posY - self.view.y, size, size)  # Where the cell is in the window
+
+        if clear:
+            self.window.fill((47, 48, 47), rect)
+
+        if (posX, posY) in snake.occupied and 0 <= posX < self.board.width and 0 <= posY < self.board.height:
+            pygame.draw.rect(self.window, snake.head.color, rect)
+
+        if posX == snack.posX and posY == snack.posY:
+            pygame.draw.rect(self.window, snack.color, rect)
+
+    def remember(self, snake, snack, score):
+        """
+        Stores what the last frame showed, to know what to repaint next time.
+
+        :param snake: The snake on the board
+        :param snack: The snack on the board
+        :param score: The current score
+        """
+        tail = snake.body[-1]
+        self.lastTail = (tail.posX, tail.posY)
+        self.lastSnack = (snack.posX, snack.posY)
+        self.lastScore = score
+        self.dirty = set()
+
+
+def profileOverlay(profiler, clock):
+    """
+    Renders the profiler's rolling percentiles and the clock's measured rates for the on-screen overlay.
+
+    :param profiler: TickProfiler of the game
+    :param clock: FixedStepClock of the game
+    :return: Surface the size of DirtyRenderer.overlayArea
+    """
+    overlay = pygame.Surface(DirtyRenderer.overlayArea.size, pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 170))  # See-through black, the board shows underneath
+    font = assets.font(16, None)  # Pygame's default font, narrower than the game's
+    lines = ["ms        p50     p95     p99     max"]
+
+    for phase, times in profiler.summary().items():
+        lines.append("%-9s %6.2f  %6.2f  %6.2f  %6.2f" % (phase, times["p50"], times["p95"], times["p99"],
+                                                           times["max"]))
+
+    lines.append("ticks/s %5.1f  frames/s %5.1f  dropped %d" % (clock.tickRate, clock.frameRate, clock.dropped))
+
+    for i, line in enumerate(lines):
+        overlay.blit(font.render(line, True, (255, 255, 255)), (6, 4 + i * 16))  # Changes every time, not cached
+
+    return overlay
 
 
 def goodSnackPos(snake, pX, pY):
@@ -281,25 +684,22 @@ def goodSnackPos(snake, pX, pY):
     :param pY: Y value of the snack
     :return: True if the coordinates are OK, false otherwise
     """
-    # For every Square in the snake's body, compares its posX and posY values to the snack's posX and posY values.
-    for index, square in enumerate(snake.body):
-        if square.posX == pX and square.posY == pY:  # If posX and posY are both equal
-            return False
-
-    return True
+    return (pX, pY) not in snake.occupied  # Looks the coordinates up in the snake's occupancy index
 
 
-def newSnack():
+def newSnack(snake, rng):
     """
-    Randomly generates coordinates for a potential new snack.
-    :return a list with the X and Y coordinates
+    Randomly picks coordinates for a new snack out of the positions the snake does not cover (Not including borders).
+    :param snake: The snake on the board
+    :param rng: The game's GameRng
+    :return a list with the X and Y coordinates, or None if the snake covers the whole board
     """
-    posX = random.randint(1, 28)  # Generates a number for posX (Not including borders)
-    posY = random.randint(1, 28)  # Generates a number for posY (Not including borders)
-    posX = posX * 20  # Multiplies X by the width of a cube
-    posY = posY * 20  # Multiplies Y by the height of a cube
+    cell = snake.free.choice(rng)  # One pick from the free cells, no need to retry
+
+    if cell is None:
+        return None
 
-    return [posX, posY]
+    return [cell[0] * snake.size, cell[1] * snake.size]  # Multiplies the cell by the width and height of a cube
 
 
 def drawSnack(window, snack, snackColor):
@@ -310,7 +710,7 @@ def drawSnack(window, snack, snackColor):
     :param snack: Snack to be drawn
     :param snackColor: Color of the snack
     """
-    pygame.draw.rect(window, snackColor, (snack.posX, snack.posY, 20, 20))
+    pygame.draw.rect(window, snackColor, (snack.posX, snack.posY, snack.width, snack.height))
 
 
 def snakeHit(snake):
@@ -320,411 +720,461 @@ def snakeHit(snake):
     :param snake: The snake on the board
     :return: True if Snake has collided, False otherwise
     """
-    for index, square in enumerate(snake.body):
-        if index == 0:  # Skips over the head
-            continue
-        elif snake.head.posX == square.posX and snake.head.posY == square.posY:  # Compares the head to the body part
-            return True
-
-    return False
+    # The head always covers its own position, so any other Square there means the snake has collided
+    return snake.occupied[(snake.head.posX, snake.head.posY)] > 1
 
 
 def helpWindow(window):
     """
     helpWindow displays a new window that contains the controls, instructions, and objective for players to see.
-    :param window:
-    :return:
+
+    :param window: Window to be drawn on
+    :return: The next scene, or None if the window was closed
     """
     run = True
-    font = pygame.font.Font("data/8-bit-pusab.ttf", 18)  # Font used to display score
-    controls = font.render("To move the snake, use \"WASD\"", True, (255, 255, 255))
-    controls2 = font.render("or the arrow keys!", True, (255, 255, 255))
-    objective = font.render("Eat food and the snake will grow...", True, (255, 255, 255))
-    objective2 = font.render("but do not eat yourself!", True, (255, 255, 255))
+    font = assets.font(18)  # Font used to display score
+    controls = assets.text(font, "To move the snake, use \"WASD\"", True, (255, 255, 255))
+    controls2 = assets.text(font, "or the arrow keys!", True, (255, 255, 255))
+    objective = assets.text(font, "Eat food and the snake will grow...", True, (255, 255, 255))
+    objective2 = assets.text(font, "but do not eat yourself!", True, (255, 255, 255))
     back = Button(150, 400, 300, 75, "Back to Menu")
+    back.highlight(pygame.mouse.get_pos())
+    redrawNeeded = True  # The screen is only redrawn when something on it changes
 
     while run:
-        for event in pygame.event.get():
+        if redrawNeeded:
+            window.fill((47, 48, 47))  # Fills background with a GRAY color
+            window.blit(controls, (60, 150))
+            window.blit(controls2, (150, 190))
+            window.blit(objective, (30, 270))
+            window.blit(objective2, (120, 310))
+            back.draw(window)
+            pygame.display.update()
+            redrawNeeded = False
+
+        for event in waitForEvents():
             if event.type == pygame.QUIT:
-                pygame.quit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if back.hover(mousePos):
+                return None
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if back.hover(event.pos):
                     run = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    run = False
+            elif event.type == pygame.MOUSEMOTION:
+                redrawNeeded |= back.highlight(event.pos)
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):  # The window needs repainting
+                redrawNeeded = True
 
-        mousePos = pygame.mouse.get_pos()
-        window.fill((47, 48, 47))  # Fills background with a GRAY color
-        window.blit(controls, (60, 150))
-        window.blit(controls2, (150, 190))
-        window.blit(objective, (30, 270))
-        window.blit(objective2, (120, 310))
-        back.draw(window)
-        keys = pygame.key.get_pressed()
-
-        if keys[pygame.K_SPACE]:
-            run = False
-
-        if pygame.MOUSEMOTION:
-            if back.hover(mousePos):
-                back.color = (124, 230, 124)
-            else:
-                back.color = (107, 199, 107)
-
-        pygame.display.update()
-
-    mainMenu()
+    return mainMenu, ()
 
 
 def highScoreWin(window):
     """
     Window in which the user's high scores are displayed.
-    :param window:
-    :return:
+
+    :param window: Window to be drawn on
+    :return: The next scene, or None if the window was closed
     """
     run = True
     back = Button(150, 462, 300, 75, "Back to Menu")
     resetEasy = Button(400, 200, 40, 40, "")  # Button to reset Easy mode
     resetNormal = Button(400, 275, 40, 40, "")  # Button to reset Normal mode
     resetHard = Button(400, 350, 40, 40, "")  # Button to reset Hard mode
-    titleFont = pygame.font.Font("data/8-bit-pusab.ttf", 36)
-    font = pygame.font.Font("data/8-bit-pusab.ttf", 24)
-    resetFont = pygame.font.Font("data/8-bit-pusab.ttf", 14)
-    HSTitle = titleFont.render("High Scores:", True, (255, 255, 255))
-    resetText = resetFont.render("Reset", True, (255, 255, 255))
-    resetIcon = pygame.image.load("data/resetIcon.png")
-    resetIcon = pygame.transform.scale(resetIcon, (35, 35))
+    buttons = [back, resetEasy, resetNormal, resetHard]
+    titleFont = assets.font(36)
+    font = assets.font(24)
+    resetFont = assets.font(14)
+    HSTitle = assets.text(titleFont, "High Scores:", True, (255, 255, 255))
+    resetText = assets.text(resetFont, "Reset", True, (255, 255, 255))
+    resetIcon = assets.image("data/resetIcon.png", (35, 35))
+
+    for button in buttons:
+        button.highlight(pygame.mouse.get_pos())
+
+    redrawNeeded = True  # The screen is only redrawn when something on it changes
 
     while run:
-        for event in pygame.event.get():
+        if redrawNeeded:
+            window.fill((47, 48, 47))
+            easy = assets.text(font, "Easy: " + str(highScores.get(125)), True, (255, 255, 255))
+            normal = assets.text(font, "Normal: " + str(highScores.get(100)), True, (255, 255, 255))
+            hard = assets.text(font, "Hard: " + str(highScores.get(75)), True, (255, 255, 255))
+
+            for button in buttons:
+                button.draw(window)
+
+            window.blit(HSTitle, (100, 75))
+            window.blit(easy, (130, 200))
+            window.blit(normal, (130, 275))
+            window.blit(hard, (130, 350))
+            window.blit(resetText, (385, 165))
+            window.blit(resetIcon, (402, 202))
+            window.blit(resetIcon, (402, 277))
+            window.blit(resetIcon, (402, 352))
+            pygame.display.update()
+            redrawNeeded = False
+
+        for event in waitForEvents():
             if event.type == pygame.QUIT:
-                pygame.quit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if back.hover(mousePos):
+                return None
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if back.hover(event.pos):
                     run = False
-                elif resetEasy.hover(mousePos):
-                    file = open("data/highscores.txt")
-                    lines = file.readlines()
-                    lines[0] = "0\n"
-                    file = open("data/highscores.txt", "w")
-                    file.writelines(lines)
-                    file.close()
-                elif resetNormal.hover(mousePos):
-                    file = open("data/highscores.txt")
-                    lines = file.readlines()
-                    lines[1] = "0\n"
-                    file = open("data/highscores.txt", "w")
-                    file.writelines(lines)
-                    file.close()
-                elif resetHard.hover(mousePos):
-                    file = open("data/highscores.txt")
-                    lines = file.readlines()
-                    lines[2] = "0"
-                    file = open("data/highscores.txt", "w")
-                    file.writelines(lines)
-                    file.close()
-
-        window.fill((47, 48, 47))
-        HSFile = open("data/highscores.txt")
-        lines = HSFile.readlines()
-        HSFile.close()
-        easy = font.render("Easy: " + lines[0].strip(), True, (255, 255, 255))
-        normal = font.render("Normal: " + lines[1].strip(), True, (255, 255, 255))
-        hard = font.render("Hard: " + lines[2].strip(), True, (255, 255, 255))
-        mousePos = pygame.mouse.get_pos()
-        keys = pygame.key.get_pressed()
-        back.draw(window)
-        resetEasy.draw(window)
-        resetNormal.draw(window)
-        resetHard.draw(window)
-        window.blit(HSTitle, (100, 75))
-        window.blit(easy, (130, 200))
-        window.blit(normal, (130, 275))
-        window.blit(hard, (130, 350))
-        window.blit(resetText, (385, 165))
-        window.blit(resetIcon, (402, 202))
-        window.blit(resetIcon, (402, 277))
-        window.blit(resetIcon, (402, 352))
-
-        if keys[pygame.K_SPACE]:
-            run = False
-
-        if pygame.MOUSEMOTION:
-            if back.hover(mousePos):
-                back.color = (124, 230, 124)
-            elif resetEasy.hover(mousePos):
-                resetEasy.color = (124, 230, 124)
-            elif resetNormal.hover(mousePos):
-                resetNormal.color = (124, 230, 124)
-            elif resetHard.hover(mousePos):
-                resetHard.color = (124, 230, 124)
-            else:
-                back.color = (107, 199, 107)
-                resetEasy.color = (107, 199, 107)
-                resetNormal.color = (107, 199, 107)
-                resetHard.color = (107, 199, 107)
-
-        pygame.display.update()
+                elif resetEasy.hover(event.pos):
+                    highScores.reset(125)
+                    redrawNeeded = True
+                elif resetNormal.hover(event.pos):
+                    highScores.reset(100)
+                    redrawNeeded = True
+                elif resetHard.hover(event.pos):
+                    highScores.reset(75)
+                    redrawNeeded = True
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    run = False
+            elif event.type == pygame.MOUSEMOTION:
+                for button in buttons:
+                    redrawNeeded |= button.highlight(event.pos)
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):  # The window needs repainting
+                redrawNeeded = True
 
-    mainMenu()
+    return mainMenu, ()
 
 
-def mainMenu():
+def openWindow():
     """
-    Main menu window.
-    :return:
+    Initializes Pygame and creates the game's window, once per run.
+
+    :return: The window
     """
-    pygame.init()  # Initializes Pygame
+    pygame.display.init()  # Initializes the parts of Pygame the game uses
+    pygame.font.init()
+
+    if AUDIO:
+        sounds.init()  # Decodes the sound effects once, stays silent if there is no audio device
+
     window = pygame.display.set_mode((600, 600))  # Creates initial window
+
+    if BUNDLE_PATH and os.path.exists(BUNDLE_PATH):
+        assets.loadBundle(BUNDLE_PATH)  # Before anything is drawn, so nothing has to be decoded or rendered
+
     pygame.display.set_caption("Snake — by @thompmatt")  # Sets caption of window
-    icon = pygame.image.load("data/snakeicon.png")
-    icon = pygame.transform.scale(icon, (32, 32))
+    icon = assets.image("data/snakeicon.png", (32, 32))
     pygame.display.set_icon(icon)
+
+    return window
+
+
+def play(scene=None):
+    """
+    Runs the game until its window is closed. Every screen is a function that takes the window (and its own
+    arguments), runs until the player leaves it and returns the next scene, a (screen, arguments) tuple, or None to
+    quit. The screens are run one after the other from this loop rather than calling each other, so the call stack
+    stays the same depth however many games are played, and they all share the one window and the loaded assets.
+
+    :param scene: First scene, the main menu by default
+    """
+    window = openWindow()
+    scene = scene or (mainMenu, ())
+
+    while scene is not None:
+        screen, args = scene
+        scene = screen(window, *args)
+
+    pygame.quit()
+
+
+def mainMenu(window):
+    """
+    Main menu window.
+
+    :param window: Window to be drawn on
+    :return: The next scene, or None if the window was closed
+    """
     easy = Button(200, 250, 200, 75, "Easy")
     normal = Button(200, 362.5, 200, 75, "Normal")
     hard = Button(200, 475, 200, 75, "Hard")
     helpButton = Button(540, 20, 40, 40, "")
     hsButton = Button(485, 20, 40, 40, "")
+    autoButton = Button(20, 20, 200, 40, "Autopilot")
+    buttons = [easy, normal, hard, helpButton, hsButton, autoButton]
     helpCalled = False
     hsCalled = False
+    autopilot = False
 
-    # Reads High Scores
-    HSFile = open("data/highscores.txt", "r+")
-    HSFileLines = HSFile.readlines()
-    highScores = []
-
-    for i in range(0, 3):
-        highScores.append(HSFileLines[i])
-
-    HSFile.close()
+    for button in buttons:
+        button.highlight(pygame.mouse.get_pos())
 
     run = True
+    redrawNeeded = True  # The screen is only redrawn when something on it changes
 
     while run:
-        # If user hits the "X" quit button, closes application
-        for event in pygame.event.get():
+        if redrawNeeded:
+            window.fill((47, 48, 47))  # Fills background with a GRAY color
+            font = assets.font(60)  # Font used to display score
+            font2 = assets.font(16)  # Font used to display score
+            titleText = assets.text(font, "Snake", True, (255, 255, 255))  # Renders score text
+            author = assets.text(font2, "by @THOMPMATT", False, (255, 255, 255))
+            window.blit(titleText, (110, 80))  # Blit's text to window
+            window.blit(author, (275, 180))
+
+            for button in buttons:
+                button.draw(window)
+
+            qMark = assets.image("data/qMark.png", (32, 32))
+            trophy = assets.image("data/trophy.png", (35, 35))
+            window.blit(qMark, (543, 23))
+            window.blit(trophy, (487, 22))
+            pygame.display.update()
+            redrawNeeded = False
+
+        for event in waitForEvents():
+            # If user hits the "X" quit button, closes application
             if event.type == pygame.QUIT:
-                pygame.quit()
-
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if easy.hover(mousePos):
+                return None
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if easy.hover(event.pos):
                     diff = 125
-                    high = highScores[0]
                     run = False
-                elif normal.hover(mousePos):
+                elif normal.hover(event.pos):
                     diff = 100
-                    high = highScores[1]
                     run = False
-                elif hard.hover(mousePos):
+                elif hard.hover(event.pos):
                     diff = 75
-                    high = highScores[2]
                     run = False
-                elif helpButton.hover(mousePos):
+                elif helpButton.hover(event.pos):
                     helpCalled = True
                     run = False
-                elif hsButton.hover(mousePos):
+                elif hsButton.hover(event.pos):
                     hsCalled = True
                     run = False
-
-        window.fill((47, 48, 47))  # Fills background with a GRAY color
-        font = pygame.font.Font("data/8-bit-pusab.ttf", 60)  # Font used to display score
-        font2 = pygame.font.Font("data/8-bit-pusab.ttf", 16)  # Font used to display score
-        titleText = font.render("Snake", True, (255, 255, 255))  # Renders score text
-        author = font2.render("by @THOMPMATT", False, (255, 255, 255))
-        window.blit(titleText, (110, 80))  # Blit's text to window
-        window.blit(author, (275, 180))
-        easy.draw(window)
-        normal.draw(window)
-        hard.draw(window)
-        helpButton.draw(window)
-        hsButton.draw(window)
-        qMark = pygame.image.load("data/qMark.png")
-        qMark = pygame.transform.scale(qMark, (32, 32))
-        trophy = pygame.image.load("data/trophy.png")
-        trophy = pygame.transform.scale(trophy, (35, 35))
-        window.blit(qMark, (543, 23))
-        window.blit(trophy, (487, 22))
-        mousePos = pygame.mouse.get_pos()
-
-        if pygame.MOUSEMOTION:
-            if easy.hover(mousePos):
-                easy.color = (124, 230, 124)
-            elif normal.hover(mousePos):
-                normal.color = (124, 230, 124)
-            elif hard.hover(mousePos):
-                hard.color = (124, 230, 124)
-            elif helpButton.hover(mousePos):
-                helpButton.color = (124, 230, 124)
-            elif hsButton.hover(mousePos):
-                hsButton.color = (124, 230, 124)
-            else:
-                easy.color = (107, 199, 107)
-                normal.color = (107, 199, 107)
-                hard.color = (107, 199, 107)
-                helpButton.color = (107, 199, 107)
-                hsButton.color = (107, 199, 107)
-
-        pygame.display.update()
+                elif autoButton.hover(event.pos):
+                    diff = AUTOPILOT_DIFF
+                    autopilot = True
+                    run = False
+            elif event.type == pygame.MOUSEMOTION:
+                for button in buttons:
+                    redrawNeeded |= button.highlight(event.pos)
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):  # The window needs repainting
+                redrawNeeded = True
 
     if helpCalled:
-        helpWindow(window)
+        return helpWindow, ()
     elif hsCalled:
-        highScoreWin(window)
-    else:
-        main(window, diff, high)
+        return highScoreWin, ()
+
+    return main, (diff, autopilot)
 
 
-def main(window, diff, high):
+def main(window, diff, autopilot=False):
     """
     Main loop of the Snake game.
 
-    :param diff:
     :param window: Window to be drawn on.
+    :param diff: Milliseconds per tick
+    :param autopilot: True to let the Autopilot play instead of the keys
+    :return: The game over scene, or None if the window was closed
     """
     
-    snake = Snake()  # Creates the Snake object
+    seed = random.getrandbits(64)  # Seed of this game, everything random in it comes from rng
+    rng = GameRng(seed)
+    replay = Replay(seed, diff, board=BOARD)  # Records the direction of every tick
+    snake = Snake(BOARD)  # Creates the Snake object
+    size = BOARD.cellSize
     snackColor = (111, 201, 129)  # Color of snack (GREEN)
-    snackPos = newSnack()  # Generates coordinates for possible snack
-
-    # Continuously checks if snack has same coordinates as the head. If so, it regenerates a new snack.
-    while not goodSnackPos(snake, snackPos[0], snackPos[1]):
-        snackPos = newSnack()
-
-    snack = Square(snackPos[0], snackPos[1], snackColor)  # Creates snack
+    snackPos = newSnack(snake, rng)  # Generates coordinates for the snack, away from the snake
+    snack = Square(snackPos[0], snackPos[1], snackColor, size)  # Creates snack
 
     score = 0
-    velX = 20  # Initial X velocity, used for continuous movement
+    won = False  # Set if the snake fills the board
+    velX = size  # Initial X velocity, used for continuous movement
     velY = 0  # Initial Y velocity, used for continuous movement
     run = True
-    redraw(window, snake, snack, score)
+    closed = False  # Set if the window is closed during the game
+    renderer = DirtyRenderer(window, BOARD)  # Only repaints the cells that change from one tick to the next
+    renderer.full(snake, snack, score)
+    clock = FixedStepClock(diff / 1000)  # Runs a tick every diff milliseconds, however long each frame takes
+    profiler = TickProfiler() if PROFILE_PATH else NullProfiler()  # Times each phase of a frame
+    showProfile = False  # Set while the profiling overlay is shown (toggled with F3)
+    pilot = Autopilot() if autopilot else None
+    engine = SnakeEngine(seed, BOARD) if autopilot else None  # Plays the same game headless, for the autopilot
 
     # Main loop
     while run:
-        pygame.time.delay(diff)  # Delay between loops, slows game down
+        clock.wait()  # Sleeps until the next tick is due
+        started = profiler.start()
 
-        # If user hits the "X" quit button, closes application
         for event in pygame.event.get():
+            # If user hits the "X" quit button, closes application
             if event.type == pygame.QUIT:
-                pygame.quit()
+                closed = True
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:  # Shows or hides the profiling overlay
+                showProfile = not showProfile
+
+                if showProfile and not profiler.enabled:  # Starts profiling if it was off
+                    profiler = TickProfiler()
+                    started = profiler.start()
+                elif not showProfile:
+                    renderer.setOverlay(None)
+
+        if closed:
+            break
+
+        ticks = clock.due()  # Usually 1, more if the last frame ran late and the game has to catch up
+        started = profiler.lap("input", started)
+
+        for tick in range(ticks):
+            direction = None  # Read from the keys
+
+            if pilot:
+                direction = pilot(engine)  # The engine and the snake share the seed, so they stay in step
+                engine.advance(direction)
+                started = profiler.lap("input", started)
+
+            velX, velY, secondSquare = snake.move(velX, velY, direction)  # Calls the snake.move()
+            replay.append(DIRECTIONS[(velX // size, velY // size)])
+            started = profiler.lap("move", started)
+
+            if secondSquare or snakeHit(snake):  # Checks if a Snake has collided with itself
+                sounds.play(THUD)  # Hit itself sound effect
+                run = False
 
-        velX, velY, secondSquare = snake.move(velX, velY)  # Calls the snake.move()
+            started = profiler.lap("collision", started)
 
-        if secondSquare or snakeHit(snake):  # Checks if a Snake has collided with itself
-            mixer.music.load("data/thud.wav")  # Hit itself sound effect
-            mixer.music.play()
-            run = False
+            if snake.head.posX == snack.posX and snake.head.posY == snack.posY:  # If the snake's head collides with a
+                # snack
+                snake.addSquare()  # Adds a square to the snake
+                score += 1  # Adds 1 to score
+                snackPos = newSnack(snake, rng)  # Creates new snack coordinates, never on the snake
 
-        if snake.head.posX == snack.posX and snake.head.posY == snack.posY:  # If the snake's head collides with a snack
-            snake.addSquare()  # Adds a square to the snake
-            score += 1  # Adds 1 to score
-            snackPos = newSnack()  # Creates new snack coordinates
+                if snackPos is None:  # There is nowhere left for a snack, so the player has won
+                    won = True
+                    run = False
+                else:
+                    snack = Square(snackPos[0], snackPos[1], snackColor, size)  # Adds snack to the window
+
+            renderer.mark(snake, snack)  # Collects the cells this tick changed
+            started = profiler.lap("snack", started)
+
+            if not run:
+                break
+
+        if ticks:
+            if showProfile and (renderer.overlay is None or profiler.frames % 10 == 0):  # Refreshed every 10 frames
+                renderer.setOverlay(profileOverlay(profiler, clock))
 
-            # Checks whether coordinates are not on snake
-            while not goodSnackPos(snake, snackPos[0], snackPos[1]):
-                snackPos = newSnack()
+            renderer.draw(snake, snack, score)  # Redraws the parts of the window that changed
+            clock.frame()
+            profiler.lap("draw", started)
 
-            snack = Square(snackPos[0], snackPos[1], snackColor)  # Adds snack to the window
+        profiler.endFrame(ticks)
 
-        redraw(window, snake, snack, score)  # Redraws window
+    if PROFILE_PATH and profiler.enabled:
+        profiler.dump(PROFILE_PATH, clockRates(clock))
 
-    gameOver(window, score, diff, high)
+    if REPLAY_DIR:
+        os.makedirs(REPLAY_DIR, exist_ok=True)
+        replay.save(os.path.join(REPLAY_DIR, "%016x.snr" % seed))
 
+    if closed:
+        return None
+
+    return gameOver, (score, diff, won, autopilot)
+
+
+def gameOver(window, score, diff, won=False, autopilot=False):
+    """
+    Game over window, shows the score and high score for the difficulty that was played.
 
-def gameOver(window, score, diff, high):
-    high = int(high)
+    :param window: Window to be drawn on.
+    :param score: The score of the game that ended
+    :param diff: Difficulty of the game that ended
+    :param won: True if the game ended because the snake filled the board
+    :param autopilot: True if the autopilot played the game, its scores are not high scores
+    :return: The next scene, or None if the window was closed
+    """
     newHS = False
+    highScoreNum = None
+
+    if not autopilot:
+        if BOARD[:2] == (COLS, ROWS):  # High scores are only kept for the original board size
+            newHS = highScores.submit(diff, score)  # Saves the score if it beats the high score
+
+        highScoreNum = highScores.get(diff)
+
     run = True
     menu = False
+    back = Button(20, 20, 40, 40, "")
+    back.highlight(pygame.mouse.get_pos())
+    redrawNeeded = True  # The screen is only redrawn when something on it changes
 
     while run:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if back.hover(mousePos):
-                    menu = True
-                    run = False
-
-        if score > high:
-            newHS = True
-            high = score  # Sets new score as the highest
-            HSFile = open("data/highscores.txt", "r")
-            lines = HSFile.readlines()
-
-            if diff == 125:
-                lines[0] = str(score) + "\n"  # Edits Easy high score
-            elif diff == 100:
-                lines[1] = str(score) + "\n"  # Edits Normal high score
-            elif diff == 75:
-                lines[2] = str(score)  # Edits Hard high score
-
-            HSFile = open("data/highscores.txt", "w")
-            HSFile.writelines(lines)
-            HSFile.close()
-
-        window.fill((47, 48, 47))  # Fills background with a GRAY color
-        mousePos = pygame.mouse.get_pos()
-        font = pygame.font.Font("data/8-bit-pusab.ttf", 40)  # Font used to display score
-        font2 = pygame.font.Font("data/8-bit-pusab.ttf", 21)  # Font used to display score
-        font3 = pygame.font.Font("data/8-bit-pusab.ttf", 18)  # Font used to display score
-        gameOverText = font.render("Game Over", True, (255, 255, 255))  # Renders score text
-        scoreText = font2.render("Score: " + str(score), True, (255, 255, 255))
-        back = Button(20, 20, 40, 40, "")
-        back.draw(window)
-        arrow = pygame.image.load("data/back.png")
-        arrow = pygame.transform.scale(arrow, (25, 25))
-        window.blit(arrow, (26, 27))
-        keys = pygame.key.get_pressed()
-        HSFile = open("data/highscores.txt")
-        lines = HSFile.readlines()
-
-        if diff == 125:
-            highScoreNum = lines[0].strip()
-            highScoreText = font2.render("High Score: " + highScoreNum, True, (255, 255, 255))
-        elif diff == 100:
-            highScoreNum = lines[1].strip()
-            highScoreText = font2.render("High Score: " + highScoreNum, True, (255, 255, 255))
-        elif diff == 75:
-            highScoreNum = lines[2].strip()
-            highScoreText = font2.render("High Score: " + highScoreNum, True, (255, 255, 255))
-
-        restart = font3.render("Press \"SPACE\" to play again", True, (255, 255, 255))
-        window.blit(gameOverText, [120, 240])  # Blit's text to window
-        window.blit(restart, [75, 500])
-
-        # Displays score to screen
-        if score > 99:
-            window.blit(scoreText, [205, 310])
-        elif score > 9:
-            window.blit(scoreText, [215, 310])
-        else:
-            window.blit(scoreText, [225, 310])
+        if redrawNeeded:
+            window.fill((47, 48, 47))  # Fills background with a GRAY color
+            font = assets.font(40)  # Font used to display score
+            font2 = assets.font(21)  # Font used to display score
+            font3 = assets.font(18)  # Font used to display score
+            # Renders score text
+            gameOverText = assets.text(font, "You Win!" if won else "Game Over", True, (255, 255, 255))
+            scoreText = assets.text(font2, "Score: " + str(score), True, (255, 255, 255))
+            back.draw(window)
+            arrow = assets.image("data/back.png", (25, 25))
+            window.blit(arrow, (26, 27))
+            if autopilot:
+                highScoreText = assets.text(font2, "Autopilot", True, (255, 255, 255))
+            else:
+                highScoreText = assets.text(font2, "High Score: " + str(highScoreNum), True, (255, 255, 255))
 
-        # Displays high score to screen
-        if int(highScoreNum) > 99:
-            window.blit(highScoreText, [150, 350])
-        elif int(highScoreNum) > 9:
-            window.blit(highScoreText, [160, 350])
-        else:
-            window.blit(highScoreText, [170, 350])
+            restart = assets.text(font3, "Press \"SPACE\" to play again", True, (255, 255, 255))
+            window.blit(gameOverText, [300 - gameOverText.get_width() // 2, 240])  # Blit's text to window, centered
+            window.blit(restart, [75, 500])
 
-        if newHS:
-            newHSText = font2.render("New High Score!", True, (255, 255, 255))
-            window.blit(newHSText, [150, 100])
+            # Displays score to screen
+            if score > 99:
+                window.blit(scoreText, [205, 310])
+            elif score > 9:
+                window.blit(scoreText, [215, 310])
+            else:
+                window.blit(scoreText, [225, 310])
+
+            # Displays high score to screen
+            if autopilot:
+                window.blit(highScoreText, [300 - highScoreText.get_width() // 2, 350])
+            elif highScoreNum > 99:
+                window.blit(highScoreText, [150, 350])
+            elif highScoreNum > 9:
+                window.blit(highScoreText, [160, 350])
+            else:
+                window.blit(highScoreText, [170, 350])
 
-        if keys[pygame.K_SPACE]:
-            run = False
+            if newHS:
+                newHSText = assets.text(font2, "New High Score!", True, (255, 255, 255))
+                window.blit(newHSText, [150, 100])
 
-        if pygame.MOUSEMOTION:
-            if back.hover(mousePos):
-                back.color = (124, 230, 124)
-            else:
-                back.color = (107, 199, 107)
+            pygame.display.update()
+            redrawNeeded = False
 
-        pygame.display.update()
+        for event in waitForEvents():
+            if event.type == pygame.QUIT:
+                return None
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if back.hover(event.pos):
+                    menu = True
+                    run = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    run = False
+            elif event.type == pygame.MOUSEMOTION:
+                redrawNeeded |= back.highlight(event.pos)
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):  # The window needs repainting
+                redrawNeeded = True
 
     if menu:
-        mainMenu()
-    else:
-        main(window, diff, high)
+        return mainMenu, ()
+
+    return main, (diff, autopilot)
 
 
-mainMenu()
+if __name__ == "__main__":
+    play()
@@ -0,0 +1,367 @@
+# -*- coding: UTF-8 -*-
+"""
+Spectator feed for live games.
+
+A tick only adds a head cell, pops the tail cell unless the snake ate, and sometimes moves the snack, so spectators are
+sent a snapshot of the whole game when they join and a small delta per tick after that. A Broadcaster encodes each
+delta once and hands the same bytes to every subscriber. A subscriber that falls more than its limit behind stops
+getting deltas, and once it has caught up it is sent a fresh snapshot instead of the deltas it missed. The snapshot is
+also encoded at most once per tick, however many subscribers need it.
+
+Cells are wrapped onto the board. A tail that addSquare() placed outside the board is sent as the cell it wraps to,
+with the TAIL_OUTSIDE flag, since it is not drawn.
+
+Messages (big-endian):
+    SNAPSHOT   "S", ticks, score, flags, snack x and y (NO_SNACK once the board is full), length, head x and y, then
+               the step from each body cell to the next one (towards the tail) packed 4 to a byte
+    DELTA      "D", ticks, score, head x and y, flags, then snack x and y if the SNACK_MOVED flag is set
+"""
+import asyncio
+import struct
+from collections import deque
+
+from replay import packDirections, unpackDirections
+from snakeEngine import DIRECTIONS, VELOCITIES
+
+SNAPSHOT = b"S"
+DELTA = b"D"
+SNAPSHOT_HEADER = struct.Struct(">cIIBHHIHH")
+DELTA_HEADER = struct.Struct(">cIIHHB")
+CELL = struct.Struct(">HH")
+NO_SNACK = 0xFFFF
+TAIL_POPPED = 1  # The tail cell was vacated (the snake did not eat)
+TAIL_OUTSIDE = 2  # The tail is outside the board, so it is not drawn
+SNACK_MOVED = 4  # A new snack follows
+DONE = 8  # The game is over
+WON = 16  # The game ended with a full board
+
+
+def endFlags(engine):
+    """
+    :param engine: SnakeEngine
+    :return: TAIL_OUTSIDE, DONE and WON flags for its current state
+    """
+    tailX, tailY = engine.body[-1]
+    flags = TAIL_OUTSIDE if not (0 <= tailX < engine.board.cols and 0 <= tailY < engine.board.rows) else 0
+
+    return flags | (DONE if engine.done else 0) | (WON if engine.won else 0)
+
+
+def encodeSnapshot(engine):
+    """
+    :param engine: SnakeEngine of the game
+    :return: SNAPSHOT message of its whole state
+    """
+    cols, rows, cellSize = engine.board
+    body = [(x % cols, y % rows) for x, y in engine.body]
+    steps = [DIRECTIONS[((x2 - x1 + 1) % cols - 1, (y2 - y1 + 1) % rows - 1)]
+             for (x1, y1), (x2, y2) in zip(body, body[1:])]
+    snackX, snackY = engine.snack or (NO_SNACK, NO_SNACK)
+    headX, headY = body[0]
+
+    return SNAPSHOT_HEADER.pack(SNAPSHOT, engine.ticks, engine.score, endFlags(engine), snackX, snackY, len(body),
+                                headX, headY) + packDirections(steps)
+
+
+def encodeDelta(engine, ate, snackMoved):
+    """
+    :param engine: SnakeEngine of the game, just after a tick
+    :param ate: True if the snake ate during the tick
+    :param snackMoved: True if the snack changed during the tick
+    :return: DELTA message for the tick
+    """
+    headX, headY = engine.body[0]
+    flags = endFlags(engine) | (0 if ate else TAIL_POPPED) | (SNACK_MOVED if snackMoved else 0)
+    delta = DELTA_HEADER.pack(DELTA, engine.ticks, engine.score, headX, headY, flags)
+
+    if snackMoved:
+        delta += CELL.pack(*(engine.snack or (NO_SNACK, NO_SNACK)))
+
+    return delta
+
+
+async def readMessage(reader):
+    """
+    Reads one message from a stream.
+
+    :param reader: asyncio StreamReader
+    :return: The message's bytes
+    """
+    kind = await reader.readexactly(1)
+
+    if kind == SNAPSHOT:
+        header = kind + await reader.readexactly(SNAPSHOT_HEADER.size - 1)
+        length = SNAPSHOT_HEADER.unpack(header)[6]
+        return header + await reader.readexactly((length + 2) // 4)
+
+    if kind == DELTA:
+        header = kind + await reader.readexactly(DELTA_HEADER.size - 1)
+        return header + (await reader.readexactly(CELL.size) if header[-1] & SNACK_MOVED else b"")
+
+    raise ValueError("unknown message type " + repr(kind))
+
+
+class SpectatorView(object):
+    """
+    This class rebuilds a game from the messages of a spectator feed.
+    """
+
+    def __init__(self, board):
+        """
+        Creates an empty view.
+
+        :param board: Board of the game
+        """
+        self.board = board
+        self.body = deque()  # Wrapped cells of the snake, head first
+        self.tailOutside = False  # The last cell of the body is not on the board
+        self.snack = None
+        self.score = 0
+        self.ticks = 0
+        self.done = False
+        self.won = False
+        self.synced = False  # Set by the first snapshot
+
+    def apply(self, message):
+        """
+        Applies a message.
+
+        :param message: SNAPSHOT or DELTA bytes
+        """
+        if message[:1] == SNAPSHOT:
+            kind, ticks, score, flags, snackX, snackY, length, x, y = SNAPSHOT_HEADER.unpack_from(message)
+            cols, rows = self.board.cols, self.board.rows
+            self.body = deque([(x, y)])
+
+            for step in unpackDirections(message[SNAPSHOT_HEADER.size:], length - 1):
+                dX, dY = VELOCITIES[step]
+                x, y = (x + dX) % cols, (y + dY) % rows
+                self.body.append((x, y))
+
+            self.snack = None if snackX == NO_SNACK else (snackX, snackY)
+            self.synced = True
+        else:
+            if not self.synced:  # Deltas sent before the first snapshot mean nothing yet
+                return
+
+            kind, ticks, score, headX, headY, flags = DELTA_HEADER.unpack_from(message)
+
+            if flags & TAIL_POPPED:
+                self.body.pop()
+
+            self.body.appendleft((headX, headY))
+
+            if flags & SNACK_MOVED:
+                snackX, snackY = CELL.unpack_from(message, DELTA_HEADER.size)
+                self.snack = None if snackX == NO_SNACK else (snackX, snackY)
+
+        self.ticks = ticks
+        self.score = score
+        self.tailOutside = bool(flags & TAIL_OUTSIDE)
+        self.done = bool(flags & DONE)
+        self.won = bool(flags & WON)
+
+    def cells(self):
+        """
+        :return: List of the snake's cells on the board, head first
+        """
+        return list(self.body)[:-1] if self.tailOutside else list(self.body)
+
+
+class QueueSubscriber(object):
+    """
+    In-process subscriber: messages wait in a queue until get() takes them.
+    """
+
+    def __init__(self, limit=64 * 1024):
+        """
+        Creates a subscriber.
+
+        :param limit: Bytes that can wait before the subscriber is dropped to a fresh snapshot
+        """
+        self.limit = limit
+        self.queue = deque()
+        self.queued = 0  # Bytes waiting in the queue
+        self.stale = False  # Dropped, waiting for a fresh snapshot
+        self.resyncs = 0  # Times it was sent a fresh snapshot after falling behind
+        self.ready = asyncio.Event()
+
+    def backlog(self):
+        """
+        :return: Bytes sent but not taken yet
+        """
+        return self.queued
+
+    def send(self, message):
+        """
+        Queues a message.
+
+        :param message: Bytes to send
+        """
+        self.queue.append(message)
+        self.queued += len(message)
+        self.ready.set()
+
+    def drop(self):
+        """
+        Throws away the messages still waiting, a snapshot will replace them.
+        """
+        self.queue.clear()
+        self.queued = 0
+
+    def get(self):
+        """
+        :return: The oldest waiting message, or None if there is none
+        """
+        if not self.queue:
+            return None
+
+        message = self.queue.popleft()
+        self.queued -= len(message)
+
+        if not self.queue:
+            self.ready.clear()
+
+        return message
+
+    async def wait(self):
+        """
+        :return: The oldest waiting message, once there is one
+        """
+        await self.ready.wait()
+        return self.get()
+
+
+class StreamSubscriber(object):
+    """
+    Subscriber at the other end of a stream: messages are written to its asyncio StreamWriter, and what is still
+    buffered in the transport counts as its backlog.
+    """
+
+    def __init__(self, writer, limit=16 * 1024):
+        """
+        Creates a subscriber.
+
+        :param writer: asyncio StreamWriter of the spectator's connection
+        :param limit: Bytes that can wait in the transport before the subscriber is dropped to a fresh snapshot
+        """
+        self.writer = writer
+        self.limit = limit
+        self.stale = False
+        self.resyncs = 0
+
+    def backlog(self):
+        """
+        :return: Bytes written but not sent yet
+        """
+        return self.writer.transport.get_write_buffer_size()
+
+    def send(self, message):
+        """
+        Writes a message unless the connection is closing.
+
+        :param message: Bytes to send
+        """
+        if not self.writer.transport.is_closing():
+            self.writer.write(message)
+
+    def drop(self):
+        """
+        Nothing to throw away: what is already buffered are whole messages, which the snapshot will supersede.
+        """
+
+
+class Broadcaster(object):
+    """
+    This class fans one game out to its subscribers.
+    """
+
+    def __init__(self):
+        """
+        Creates a broadcaster with no subscribers.
+        """
+        self.subscribers = []
+        self.snapshot = None  # (ticks, SNAPSHOT message) of the last snapshot encoded
+        self.snack = None  # Snack after the last tick published
+        self.bytesEncoded = 0  # Bytes encoded, once per message
+        self.bytesSent = 0  # Bytes handed to subscribers
+
+    def snapshotOf(self, engine):
+        """
+        :param engine: SnakeEngine of the game
+        :return: SNAPSHOT message for its current tick, encoded once per tick
+        """
+        if self.snapshot is None or self.snapshot[0] != engine.ticks:
+            self.snapshot = (engine.ticks, encodeSnapshot(engine))
+            self.bytesEncoded += len(self.snapshot[1])
+
+        return self.snapshot[1]
+
+    def subscribe(self, subscriber, engine):
+        """
+        Adds a subscriber and sends it a snapshot of the game.
+
+        :param subscriber: QueueSubscriber or StreamSubscriber
+        :param engine: SnakeEngine of the game
+        """
+        self.subscribers.append(subscriber)
+        self.deliver(subscriber, self.snapshotOf(engine))
+
+    def unsubscribe(self, subscriber):
+        """
+        Removes a subscriber.
+
+        :param subscriber: The subscriber
+        """
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+
+    def start(self, engine):
+        """
+        Starts following a game, remembering its snack so the first tick can tell if it moved.
+
+        :param engine: SnakeEngine of the game
+        """
+        self.snack = engine.snack
+        self.snapshot = None
+
+    def publish(self, engine, ate):
+        """
+        Sends a tick to every subscriber: the delta to those keeping up, nothing to those too far behind, and a fresh
+        snapshot to those that were behind and have caught up.
+
+        :param engine: SnakeEngine of the game, just after the tick
+        :param ate: True if the snake ate during the tick
+        """
+        snackMoved = engine.snack != self.snack
+        self.snack = engine.snack
+
+        if not self.subscribers:
+            return
+
+        delta = encodeDelta(engine, ate, snackMoved)
+        self.bytesEncoded += len(delta)
+
+        for subscriber in self.subscribers:
+            backlog = subscriber.backlog()
+
+            if subscriber.stale:
+                if backlog <= subscriber.limit // 2:  # Caught up enough to take a snapshot
+                    subscriber.stale = False
+                    subscriber.resyncs += 1
+                    self.deliver(subscriber, self.snapshotOf(engine))
+            elif backlog + len(delta) > subscriber.limit:
+                subscriber.stale = True
+                subscriber.drop()
+            else:
+                self.deliver(subscriber, delta)
+
+    def deliver(self, subscriber, message):
+        """
+        Hands a message to a subscriber.
+
+        :param subscriber: The subscriber
+        :param message: Bytes to send
+        """
+        subscriber.send(message)
+        self.bytesSent += len(message)
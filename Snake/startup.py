@@ -0,0 +1,53 @@
+# -*- coding: UTF-8 -*-
+"""
+Fast-start entry point for the game.
+
+Most of the time before the first frame is spent importing pygame itself: its package imports NumPy for surfarray and
+sndarray, and pkg_resources for pkgdata, which the game never uses. With SNAKE_FAST_IMPORT=1, or in a frozen
+(packaged) build, importPygame() imports pygame without them, so those modules fall back to pygame's own stand-ins (a
+MissingModule, and plain file paths for the default font). The stand-ins stay in place for the rest of the process, so
+this is only for running the game itself, not for code that uses pygame.surfarray or pygame.sndarray. Otherwise
+pygame is imported as usual.
+
+Run it from the Snake folder:
+    SNAKE_FAST_IMPORT=1 python startup.py
+"""
+import os
+import sys
+
+OPTIONAL = ("numpy", "pkg_resources")  # Modules pygame imports for helpers the game does not use
+# Leaves the OPTIONAL modules out of pygame, only when asked to or in a packaged build
+FAST_IMPORT = os.environ.get("SNAKE_FAST_IMPORT", "0") != "0" or getattr(sys, "frozen", False)
+
+
+def importPygame(fast=FAST_IMPORT):
+    """
+    Imports pygame, leaving out the OPTIONAL modules if asked to and nothing has imported them yet.
+
+    :param fast: True to leave the OPTIONAL modules out
+    :return: The pygame module
+    """
+    if not fast or "pygame" in sys.modules:
+        import pygame
+        return pygame
+
+    hidden = [name for name in OPTIONAL if name not in sys.modules]
+
+    for name in hidden:
+        sys.modules[name] = None  # Makes "import name" raise ImportError
+
+    try:
+        import pygame
+    finally:
+        for name in hidden:
+            if sys.modules.get(name, False) is None:
+                del sys.modules[name]
+
+    return pygame
+
+
+if __name__ == "__main__":
+    importPygame()  # Done first, so the game's own "import pygame" finds it already imported
+
+    from snakeGame import play
+    play()
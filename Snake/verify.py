@@ -0,0 +1,107 @@
+# -*- coding: UTF-8 -*-
+"""
+Server-side score verification.
+
+A submission is the seed of a game, the direction of every tick (as recorded in a Replay) and the score the client
+claims. The game is re-simulated with SnakeEngine, which uses the same rules and the same seeded snack generator as
+main(), so the claimed score can be checked without trusting the client. verifyBatch() spreads many submissions over a
+process pool.
+"""
+import os
+import struct
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from replay import Replay
+from snakeEngine import DEFAULT_BOARD, SnakeEngine
+
+Verdict = namedtuple("Verdict", ["valid", "score", "ticks", "reason"])
+
+
+def verifyScore(seed, directions, claimedScore, engine=None, board=DEFAULT_BOARD):
+    """
+    Re-simulates a game and checks its claimed score.
+
+    :param seed: Seed the game was played with
+    :param directions: Direction (int, 0 to 3) of every tick, e.g. Replay.directions
+    :param claimedScore: Score the client claims
+    :param engine: SnakeEngine to reuse, a new one is made if None or if it plays on another board
+    :param board: Board the game was played on
+    :return: Verdict with the score the inputs really reach and why the claim was rejected, if it was
+    """
+    if engine is None or engine.board[:2] != board[:2]:
+        engine = SnakeEngine(seed, board)
+    else:
+        engine.reset(seed)
+
+    advance = engine.advance
+
+    for tick, direction in enumerate(directions):
+        if type(direction) is not int or not 0 <= direction <= 3:  # Anything else would index VELOCITIES or fail
+            return Verdict(False, engine.score, tick, "invalid direction at tick " + str(tick))
+
+        advance(direction)
+
+        if engine.done and tick != len(directions) - 1:
+            return Verdict(False, engine.score, engine.ticks, "inputs continue after the game ended")
+
+    if not engine.done:
+        return Verdict(False, engine.score, engine.ticks, "the game did not end")
+
+    if engine.score != claimedScore:
+        return Verdict(False, engine.score, engine.ticks, "claimed " + str(claimedScore) + " but scored "
+                       + str(engine.score))
+
+    return Verdict(True, engine.score, engine.ticks, "")
+
+
+def verifyReplay(data, claimedScore):
+    """
+    Checks a claimed score against an encoded replay.
+
+    :param data: Replay bytes, as written by Replay.encode()
+    :param claimedScore: Score the client claims
+    :return: Verdict
+    """
+    try:
+        replay = Replay.decode(data)
+    except (ValueError, IndexError, struct.error) as error:
+        return Verdict(False, 0, 0, "unreadable replay: " + str(error))
+
+    return verifyScore(replay.seed, replay.directions, claimedScore, board=replay.board)
+
+
+def verifyChunk(submissions):
+    """
+    Verifies a list of submissions in the current process.
+
+    :param submissions: List of (seed, directions, claimedScore)
+    :return: List of Verdicts, in the same order
+    """
+    engine = SnakeEngine()
+
+    return [verifyScore(seed, directions, claimedScore, engine) for seed, directions, claimedScore in submissions]
+
+
+def verifyBatch(submissions, workers=None, chunkSize=256):
+    """
+    Verifies many submissions on a process pool.
+
+    :param submissions: List of (seed, directions, claimedScore)
+    :param workers: Number of worker processes (defaults to the number of cores)
+    :param chunkSize: Submissions handed to a worker at once
+    :return: List of Verdicts, in the same order as the submissions
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = [submissions[i:i + chunkSize] for i in range(0, len(submissions), chunkSize)]
+
+    if workers == 1 or len(chunks) <= 1:
+        return verifyChunk(submissions)
+
+    verdicts = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunkVerdicts in pool.map(verifyChunk, chunks):
+            verdicts.extend(chunkVerdicts)
+
+    return verdicts